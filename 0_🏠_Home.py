@@ -7,7 +7,7 @@ st.sidebar.success("Select a page from the sidebar.")
 
 st.markdown(
     """
-    This Dashboard shows real-time data about the Yext Search business and feature KPIs.
+    This Dashboard shows data about the Yext Search business and feature KPIs, refreshed in the background as the exports change.
     Select a page from the sidebar to get started.
 """
 )
@@ -0,0 +1,128 @@
+import functools
+import inspect
+import os
+import threading
+import time
+
+import pandas as pd
+
+from dashboard import pushdown
+from dashboard.atomic import replacing
+from dashboard.data import CACHE, cached, note_served, resolve_sources, stat_signature
+
+# Derived frames and summary numbers precomputed by `python -m dashboard.precompute`
+ARTIFACT_FILE = os.environ.get("DASHBOARD_ARTIFACT", "data/dashboard.snapshot.pkl")
+ARTIFACT_VERSION = 5
+
+# The precompute job turns this off so it never serves results from its own previous output
+ENABLED = True
+
+
+def source_signature(path):
+    # Size and modification time only, so the artifact stays valid when the repo is moved
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+# The artifact last read from each path, with the signature of the file it was read from. It is
+# held here rather than in the frame cache, whose size bound would skip a large artifact and
+# make every precomputed call unpickle it again.
+_ARTIFACTS = {}
+_ARTIFACTS_LOCK = threading.Lock()
+
+
+def read_artifact(path=ARTIFACT_FILE):
+    # Read once per artifact version, however many results a rerun asks for. The results it
+    # serves are tracked individually, with the sources they were computed from.
+    signature = stat_signature(path)
+    with _ARTIFACTS_LOCK:
+        loaded = _ARTIFACTS.get(path)
+        if loaded is None or loaded[0] != signature:
+            artifact = pd.read_pickle(path) if os.path.exists(path) else {}
+            if artifact.get("version") != ARTIFACT_VERSION:
+                artifact = {}
+            loaded = _ARTIFACTS[path] = (signature, artifact)
+        return loaded[1]
+
+
+def result_key(func, args, kwargs):
+    # Positional and keyword calls of the same loader share an entry
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return (func.__module__, func.__qualname__, tuple(bound.arguments.items()))
+
+
+def is_current(artifact, sources):
+    # A source that is missing here (e.g. not deployed alongside the artifact) doesn't
+    # invalidate it, but one that changed since the job ran does
+    recorded = artifact["sources"]
+    for source in sources:
+        signature = source_signature(source)
+        if signature is not None and recorded.get(source) != signature:
+            return False
+    # With pushdown, results are computed from the query backend's tables instead, which the
+    # file signatures don't cover
+    current = pushdown.current_data_version() if pushdown.PUSHDOWN else None
+    return artifact["data_version"] == current
+
+
+def precomputed(*sources):
+    # Serve a loader's result from the precomputed artifact while its sources are unchanged,
+    # otherwise compute (and cache) it in process as before
+    def decorator(func):
+        compute = cached(*sources)(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if ENABLED:
+                artifact = read_artifact()
+                key = result_key(func, args, kwargs)
+                if key in artifact.get("results", {}):
+                    files = resolve_sources(sources)
+                    signature = tuple(artifact["sources"].get(source) for source in files)
+                    if is_current(artifact, files):
+                        note_served(signature, artifact["created"])
+                        return artifact["results"][key]
+
+                    # The sources changed since the job ran: with a background refresher, keep
+                    # serving the job's result until the live one has been built
+                    live_key = compute.key(args, kwargs)
+                    if CACHE.serves_stale() and not CACHE.has(live_key):
+                        CACHE.revalidator.submit(live_key, lambda: compute(*args, **kwargs))
+                        note_served(signature, artifact["created"], stale=True)
+                        return artifact["results"][key]
+            return compute(*args, **kwargs)
+
+        wrapper.sources = sources
+        return wrapper
+
+    return decorator
+
+
+def write_artifact(jobs, path=ARTIFACT_FILE):
+    # jobs: (loader, args, kwargs) triples. Source signatures are taken before computing, so
+    # a file rewritten while the job runs makes the artifact stale rather than wrongly fresh.
+    sources = {}
+    for loader, args, kwargs in jobs:
+        for source in resolve_sources(loader.sources):
+            sources[source] = source_signature(source)
+    data_version = pushdown.data_version() if pushdown.PUSHDOWN else None
+
+    results = {}
+    for loader, args, kwargs in jobs:
+        results[result_key(loader, args, kwargs)] = loader(*args, **kwargs)
+
+    artifact = {
+        "version": ARTIFACT_VERSION,
+        "created": time.time(),
+        "sources": sources,
+        "data_version": data_version,
+        "results": results,
+    }
+    # Write then rename, so pages never read a half-written artifact
+    with replacing(path) as temporary:
+        pd.to_pickle(artifact, temporary)
+    return artifact
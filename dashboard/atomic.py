@@ -0,0 +1,28 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+# mkstemp creates files only their owner can read; replaced files get the permissions a plain
+# open() would have given them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextmanager
+def replacing(path):
+    # Yields a temporary file next to `path` to write its new content to. It only replaces
+    # `path` once the block completes, so readers never see a half-written file, and each writer
+    # gets its own, so concurrent writers (e.g. the precompute job and the app) never truncate or
+    # rename each other's.
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(
+        prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory
+    )
+    os.close(descriptor)
+    try:
+        yield temporary
+        os.chmod(temporary, 0o666 & ~_UMASK)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
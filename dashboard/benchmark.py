@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from dashboard import artifact, cards, profiling
+from dashboard.data import CACHE, resolve_sources
+from dashboard.precompute import JOBS
+from dashboard.rollup import state_path
+from dashboard.search_business import DAILY_ACV_FILE, load_deals
+from dashboard.synthetic import generate
+
+SCALES = [10000, 100000, 1000000]
+
+
+def reset():
+    # Every pass starts cold: no cached frames, card fragments or persisted ACV rollup
+    CACHE.clear()
+    with cards._CARDS_LOCK:
+        cards._CARDS.clear()
+    if os.path.exists(state_path(DAILY_ACV_FILE)):
+        os.remove(state_path(DAILY_ACV_FILE))
+
+
+def render_deal_cards():
+    new_logos, renewals, top_businesses = load_deals(filters=())
+    for deals, color in [(new_logos, "#d2f8d2"), (renewals, "#d2e5f8"), (top_businesses, None)]:
+        cards.card_grid(deals, color or "#D3D3D3")
+
+
+def run_pipelines(memory=False):
+    # Everything both pages compute with their default widget values, plus the deal cards.
+    profiling.start_run("benchmark", memory=memory)
+    for loader, args, kwargs in JOBS:
+        loader(*args, **kwargs)
+    with profiling.stage("deal cards"):
+        render_deal_cards()
+    return profiling.finish_run()
+
+
+def job_labels():
+    # Label and source files of each top-level stage of run_pipelines()
+    labels = [
+        (
+            loader.__name__ + ("(" + ", ".join(map(str, args)) + ")" if args else ""),
+            resolve_sources(loader.sources),
+        )
+        for loader, args, kwargs in JOBS
+    ]
+    return labels + [("deal cards", resolve_sources(load_deals.sources))]
+
+
+def summarize(run, source_rows, memory_run=None):
+    # One row per job; throughput is the job's source rows over its wall time. Jobs that reuse
+    # a cached frame only pay for their own work, so the first job reading a source is the
+    # one that carries its parsing cost.
+    stages = [record for record in run.stages if record["depth"] == 0]
+    if memory_run is not None:
+        peaks = [record for record in memory_run.stages if record["depth"] == 0]
+    jobs = []
+    for i, (record, (label, files)) in enumerate(zip(stages, job_labels())):
+        rows = sum(source_rows[os.path.basename(file)] for file in files)
+        job = {
+            "job": label,
+            "rows": rows,
+            "seconds": record["seconds"],
+            "rows_per_second": rows / record["seconds"] if record["seconds"] else None,
+        }
+        if memory_run is not None:
+            job["peak_mb"] = peaks[i].get("peak_mb")
+        jobs.append(job)
+    return jobs
+
+
+def benchmark(rows, workdir, seed=0, memory=True, snapshots=False):
+    start = time.perf_counter()
+    files = generate(os.path.join(workdir, "data"), rows, seed, snapshots=snapshots)
+    generated = time.perf_counter() - start
+    source_rows = {os.path.basename(file): count for file, count in files.items()}
+
+    # The loaders read the relative data/ paths the pages use
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        reset()
+        run = run_pipelines()
+        footprint = CACHE.footprint()
+        memory_run = None
+        if memory:
+            # Tracing slows allocation-heavy stages, so memory is measured in a separate pass
+            reset()
+            memory_run = run_pipelines(memory=True)
+        reset()
+    finally:
+        os.chdir(cwd)
+
+    return {
+        "rows": rows,
+        "snapshots": snapshots,
+        "generate_seconds": round(generated, 3),
+        "source_rows": source_rows,
+        "jobs": summarize(run, source_rows, memory_run),
+        "cache_mb": round(footprint["mb"].sum(), 3),
+        "footprint": footprint.to_dict("records"),
+        "stages": run.to_dict()["stages"],
+    }
+
+
+def main():
+    # Offline benchmark of both pages' pipelines on synthetic data, e.g.
+    #   python -m dashboard.benchmark --rows 10000 100000 1000000 10000000 --output bench.json
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard pipelines.")
+    parser.add_argument("--rows", type=int, nargs="+", default=SCALES, help="quoteline counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--snapshots", action="store_true", help="read Arrow snapshots")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory pass")
+    parser.add_argument("--output", help="write the results, with every stage, as JSON")
+    args = parser.parse_args()
+
+    artifact.ENABLED = False
+    # Warm up imports and plotly's templates so the first scale isn't charged for them
+    with tempfile.TemporaryDirectory() as workdir:
+        benchmark(1000, workdir, args.seed, memory=False)
+
+    results = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as workdir:
+            result = benchmark(rows, workdir, args.seed, not args.no_memory, args.snapshots)
+        results.append(result)
+
+        jobs = pd.DataFrame(result["jobs"])
+        total = jobs["seconds"].sum()
+        print(
+            f"\n{rows:,} quotelines ({total:.2f}s total, {result['cache_mb']:,.1f} MB cached, "
+            f"data generated in {result['generate_seconds']:.1f}s)"
+        )
+        print(jobs.to_string(index=False, float_format=lambda value: f"{value:,.3f}"))
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from dashboard.profiling import timed
+
+CARD_COLUMNS = ["NAME", "NET_TOTAL_USD", "TIER", "START_DATE", "END_DATE", "CLOSE_DATE"]
+MAX_CACHED_CARDS = 50000
+
+CARD_TEMPLATE = """
+    <div class="card" style="background-color: {color}; padding: 8px; margin:8px; width:300px; border-radius: 10px; display:flex;">
+        <div class="card-body" style="display: flex; flex-direction: column; justify-content: space-between; justify-content: space-between;">
+            <h5 class="card-title" style="color: black;">{business}</h5>
+            <div class="card-text">
+                <p style="color: black;">
+                    <span>{value} TCV</span>
+                </p>
+                <p style="color: black;">
+                    <span>{tier}</span>
+                </p>
+                <p style="color: black;">
+                    <span>{start_date}</span>
+                    to
+                    <span>{end_date}</span>
+                </p>
+                <p style="color: black;">
+                    <span>Deal Closed {close_date}</span>
+                </p>
+            </div>
+        </div>
+    </div>
+    """
+
+GRID_TEMPLATE = """
+    <div style="display: flex; flex-wrap: wrap;">
+        {cards}
+    </div>
+    """
+
+# Rendered card fragments, keyed on the deal fields they show and the card color
+_CARDS = OrderedDict()
+_CARDS_LOCK = threading.Lock()
+
+
+def format_dates(dates):
+    return pd.to_datetime(dates).dt.strftime("%B, %Y").fillna("")
+
+
+def format_cards(deals):
+    # Format every displayed field column-wise, once per grid rather than once per card
+    names = deals["NAME"].astype(str)
+    tiers = deals["TIER"].astype(object)
+    return pd.DataFrame(
+        {
+            "business": names.where(names.str.len() <= 20, names.str[:20] + "..."),
+            "value": deals["NET_TOTAL_USD"].map("${:,.0f}".format),
+            "tier": tiers.where(tiers.notna(), "Additional 2M Searches"),
+            "start_date": format_dates(deals["START_DATE"]),
+            "end_date": format_dates(deals["END_DATE"]),
+            "close_date": format_dates(deals["CLOSE_DATE"]),
+        }
+    )
+
+
+def card_keys(deals, color):
+    # Missing values become None so that rows with a missing tier still hit the cache
+    columns = [deals[column].astype(object) for column in CARD_COLUMNS]
+    columns = [column.where(column.notna(), None).tolist() for column in columns]
+    return [(color,) + key for key in zip(*columns)]
+
+
+def render_cards(deals, color="#D3D3D3"):
+    keys = card_keys(deals, color)
+    cards = []
+    with _CARDS_LOCK:
+        for key in keys:
+            card = _CARDS.get(key)
+            if card is not None:
+                _CARDS.move_to_end(key)
+            cards.append(card)
+
+    missing = [i for i, card in enumerate(cards) if card is None]
+    if missing:
+        fields = format_cards(deals.iloc[missing])
+        for i, row in zip(missing, fields.to_dict("records")):
+            cards[i] = CARD_TEMPLATE.format(color=color, **row)
+
+        with _CARDS_LOCK:
+            for i in missing:
+                _CARDS[keys[i]] = cards[i]
+            while len(_CARDS) > MAX_CACHED_CARDS:
+                _CARDS.popitem(last=False)
+    return cards
+
+
+@timed()
+def card_grid(deals, color="#D3D3D3"):
+    return GRID_TEMPLATE.format(cards="".join(render_cards(deals, color)))
@@ -0,0 +1,44 @@
+import pandas as pd
+import plotly.express as px
+
+from dashboard.profiling import timed
+
+TOP_N = 25
+
+
+def top_n_per_parent(frame, parent, value, child="NAME", n=TOP_N, other=None):
+    # Keep the n largest children of each parent and collapse the rest into a single
+    # "Other (k businesses)" child (or `other`, when given), so a chart's size no longer grows
+    # with the customer base
+    frame = frame[[parent, child, value]].sort_values([parent, value], ascending=[True, False])
+    rank = frame.groupby(parent, observed=True).cumcount()
+
+    top = frame[rank < n]
+    tail = (
+        frame[rank >= n]
+        .groupby(parent, observed=True)
+        .agg(**{value: (value, "sum"), "COUNT": (value, "size")})
+        .sort_index()
+        .reset_index()
+    )
+    tail[child] = other or "Other (" + tail["COUNT"].astype(str) + " businesses)"
+    return pd.concat([top, tail[[parent, child, value]]], ignore_index=True)
+
+
+@timed()
+def treemap_json(frame, parent, value, child="NAME", n=TOP_N, height=1000):
+    # Serialized figure JSON is cheap to cache and to hand to st.plotly_chart as a dict
+    # px groups categoricals by every category, observed or not, so plot plain values
+    frame = top_n_per_parent(frame, parent, value, child, n).astype({parent: object, child: object})
+    fig = px.treemap(
+        frame,
+        path=[px.Constant("All"), parent, child],
+        values=value,
+        color=parent,
+        color_discrete_sequence=px.colors.qualitative.Pastel,
+        height=height,
+    )
+    fig.update_layout(
+        coloraxis_showscale=False,
+    )
+    return fig.to_json()
@@ -0,0 +1,54 @@
+import pandas as pd
+
+from dashboard.profiling import timed
+
+DIMENSIONS = ["INDUSTRY", "COUNTRY", "CLOSE_YEAR", "IS_ACTIVE"]
+
+# Additive measures stored per cell; means are derived from them after rolling up
+MEASURES = ["BUSINESS_ID", "NET_TOTAL_USD", "ACV_USD", "ACTIVE"]
+
+
+@timed()
+def build_cube(businesses, dimensions=DIMENSIONS):
+    # One pass over the businesses: a business count and TCV/ACV sums per dimension cell
+    cube = (
+        businesses.groupby(dimensions, observed=True)
+        .agg(
+            BUSINESS_ID=("BUSINESS_ID", "count"),
+            NET_TOTAL_USD=("NET_TOTAL_USD", "sum"),
+            ACV_USD=("ACV_USD", "sum"),
+        )
+        # pandas 1.5 leaves observed categorical groups in order of appearance
+        .sort_index()
+        .reset_index()
+    )
+    # The cube is small, so its dimensions go back to plain values rather than categoricals
+    cube = cube.astype(
+        {
+            dimension: object
+            for dimension in dimensions
+            if isinstance(cube[dimension].dtype, pd.CategoricalDtype)
+        }
+    )
+    # IS_ACTIVE is a dimension, so the active count of a cell is all or none of its businesses
+    cube["ACTIVE"] = cube["BUSINESS_ID"].where(cube["IS_ACTIVE"].astype(bool), 0)
+    return cube
+
+
+def roll_up(cube, dimensions=(), **filters):
+    # Aggregate the cube to any subset of its dimensions, optionally slicing on others first,
+    # e.g. roll_up(cube, ["INDUSTRY"], IS_ACTIVE=True)
+    cells = cube
+    for dimension, value in filters.items():
+        cells = cells[cells[dimension] == value]
+
+    if dimensions:
+        totals = cells.groupby(list(dimensions), observed=True)[MEASURES].sum()
+        totals = totals.sort_index().reset_index()
+    else:
+        totals = pd.DataFrame({measure: [cells[measure].sum()] for measure in MEASURES})
+
+    totals["CUSTOMER_RETENTION"] = totals["ACTIVE"] / totals["BUSINESS_ID"]
+    totals["MEAN_NET_TOTAL_USD"] = totals["NET_TOTAL_USD"] / totals["BUSINESS_ID"]
+    totals["MEAN_ACV_USD"] = totals["ACV_USD"] / totals["BUSINESS_ID"]
+    return totals
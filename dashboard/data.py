@@ -0,0 +1,277 @@
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from dashboard.profiling import stage
+from dashboard.snapshots import has_fresh_snapshot, load_snapshot, read_csv, snapshot_path
+
+# Cached frames expire after 10 min (matching the old run_query TTL) or as soon as a source
+# file changes on disk. The whole cache is bounded in memory and evicts least recently used.
+CACHE_TTL = int(os.environ.get("DASHBOARD_CACHE_TTL", 600))
+CACHE_MAX_BYTES = int(os.environ.get("DASHBOARD_CACHE_MAX_MB", 1024)) * 1024 * 1024
+
+
+def stat_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return (os.path.abspath(path), None)
+    return (os.path.abspath(path), stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def file_signature(path):
+    # Identity of a source file and its snapshot; changes whenever either is rewritten
+    return (stat_signature(path), stat_signature(snapshot_path(path)))
+
+
+def resolve_sources(sources):
+    # Sources are files, or functions returning the files a call reads at the time
+    files = []
+    for source in sources:
+        files.extend(source() if callable(source) else [source])
+    return files
+
+
+# The background refresher's thread rebuilds stale entries in place of the viewers it serves
+_REFRESHING = threading.local()
+
+# Source signatures and build time of every cached value served to this thread since
+# track_served(), so a page can show which version of the data it rendered
+_SERVED = threading.local()
+
+
+def track_served():
+    _SERVED.entries = []
+
+
+def note_served(signature, built, stale=False):
+    entries = getattr(_SERVED, "entries", None)
+    if entries is not None:
+        entries.append({"signature": signature, "built": built, "stale": stale})
+
+
+def served():
+    return getattr(_SERVED, "entries", None) or []
+
+
+def estimate_size(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (pa.Table, np.ndarray)):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value)
+    if hasattr(value, "__dict__"):
+        # The frames an index was built from are cached, and counted, by the loader that built
+        # them
+        return estimate_size({k: v for k, v in vars(value).items() if k != "frames"})
+    return sys.getsizeof(value)
+
+
+def describe_key(key):
+    # Readable name of a cache key: the function and its arguments, or the file that was read
+    if len(key) == 5 and isinstance(key[2], bytes):
+        filename, qualname, code, args, kwargs = key
+        arguments = [repr(arg) for arg in args] + [f"{name}={value!r}" for name, value in kwargs]
+        return f"{qualname}({', '.join(arguments)})"
+    return " ".join(str(part) for part in key if part is not None)
+
+
+class FrameCache:
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.build_locks = {}
+        # Set by the background refresher: stale entries are then kept and served while it
+        # rebuilds them, instead of making the viewer wait for the rebuild
+        self.revalidator = None
+
+    def serves_stale(self):
+        return self.revalidator is not None and not getattr(_REFRESHING, "active", False)
+
+    def is_fresh(self, entry, signature=None):
+        if signature is None:
+            signature = tuple(file_signature(source) for source in entry["sources"])
+        return entry["signature"] == signature and time.monotonic() <= entry["expires"]
+
+    def has(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def get_or_build(self, key, sources, build, ttl=CACHE_TTL, track=True):
+        # `track`: whether the value counts as data shown to the viewer for served()
+        signature = tuple(file_signature(source) for source in sources)
+        value = self.lookup(key, signature, track)
+        if value is not None:
+            return value
+
+        if self.serves_stale():
+            with self.lock:
+                entry = self.entries.get(key)
+            if entry is not None:
+                entry["used"] = time.monotonic()
+                self.revalidator.submit(
+                    key, lambda: self.get_or_build(key, sources, build, ttl, track)
+                )
+                if track:
+                    note_served(entry["signature"], entry["built"], stale=True)
+                return entry["value"]
+
+        # Only one session builds a given entry; concurrent viewers wait for its result
+        with self.lock:
+            build_lock = self.build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            value = self.lookup(key, signature, track)
+            if value is None:
+                value = build()
+                self.store(key, signature, value, ttl, sources, build)
+                if track:
+                    note_served(signature, time.time())
+        return value
+
+    def lookup(self, key, signature, track=True):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if not self.is_fresh(entry, signature):
+                # A refresher swaps in the rebuilt value; until then the stale one is served
+                if self.revalidator is None:
+                    self.discard(key)
+                return None
+            self.entries.move_to_end(key)
+            entry["used"] = time.monotonic()
+            if track:
+                note_served(entry["signature"], entry["built"])
+            return entry["value"]
+
+    def store(self, key, signature, value, ttl, sources=(), build=None):
+        size = estimate_size(value)
+        with self.lock:
+            self.discard(key)
+            if size > self.max_bytes:
+                return
+            self.entries[key] = {
+                "value": value,
+                "signature": signature,
+                "expires": time.monotonic() + ttl,
+                "size": size,
+                "built": time.time(),
+                "sources": tuple(sources),
+                "build": build,
+                "ttl": ttl,
+                "used": time.monotonic(),
+            }
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                self.discard(next(iter(self.entries)))
+
+    def sweep(self):
+        # (key, sources, build, ttl) of every entry the background refresher should rebuild.
+        # Entries no viewer used within their TTL, e.g. a filter combination picked once, are
+        # dropped instead. Entries read from files are only rebuilt once one of them changed and
+        # otherwise get their TTL renewed, as a rebuild would give the same value; entries
+        # without any, such as warehouse queries, are rebuilt when their TTL expires.
+        now = time.monotonic()
+        with self.lock:
+            entries = list(self.entries.items())
+        stale = []
+        for key, entry in entries:
+            if entry["build"] is None:
+                continue
+            if now - entry["used"] > entry["ttl"]:
+                with self.lock:
+                    if self.entries.get(key) is entry:
+                        self.discard(key)
+                continue
+            if entry["sources"]:
+                signature = tuple(file_signature(source) for source in entry["sources"])
+                if signature == entry["signature"]:
+                    entry["expires"] = now + entry["ttl"]
+                    continue
+            elif now <= entry["expires"]:
+                continue
+            stale.append((key, entry["sources"], entry["build"], entry["ttl"]))
+        return stale
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry["size"]
+
+    def footprint(self):
+        # Estimated resident size of each cached entry, largest first
+        with self.lock:
+            entries = [(describe_key(key), entry["size"]) for key, entry in self.entries.items()]
+        return pd.DataFrame(
+            [{"entry": name, "mb": round(size / 1e6, 3)} for name, size in entries],
+            columns=["entry", "mb"],
+        ).sort_values("mb", ascending=False, ignore_index=True)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+
+# Process-wide cache shared by every session and page
+CACHE = FrameCache()
+
+
+def cached(*sources, ttl=CACHE_TTL):
+    # Cache a function's result until one of its source files changes or the TTL expires.
+    # Results are shared across sessions, so callers must treat them as read-only.
+    # Entries without source files, e.g. warehouse queries, only expire with the TTL.
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def key(args, kwargs):
+            # Pages are re-executed on every rerun, so key on the code rather than the object.
+            # Positional, keyword and defaulted calls with the same arguments share an entry.
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            code = func.__code__
+            return (
+                code.co_filename,
+                func.__qualname__,
+                code.co_code,
+                bound.args,
+                tuple(sorted(bound.kwargs.items())),
+            )
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return CACHE.get_or_build(
+                key(args, kwargs), resolve_sources(sources), lambda: func(*args, **kwargs), ttl
+            )
+
+        wrapper.key = key
+        return wrapper
+
+    return decorator
+
+
+def read_data(file, columns=None):
+    # Prefer the memory-mapped Arrow snapshot of a file when one has been built for it
+    def load():
+        if has_fresh_snapshot(file):
+            return load_snapshot(snapshot_path(file), columns)
+        return read_csv(file, columns)
+
+    key = ("read_data", file, tuple(columns) if columns is not None else None)
+    with stage(f"read_data {os.path.basename(file)}") as record:
+        frame = CACHE.get_or_build(key, [file], load)
+        record["rows_out"] = len(frame)
+    return frame
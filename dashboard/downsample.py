@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.profiling import timed
+
+# Most points a single chart is allowed to send to the browser
+MAX_POINTS = 1000
+
+# Calendar resolutions and their pandas resample rules; "Auto" keeps the raw resolution and
+# only downsamples when the point budget is exceeded
+RESOLUTIONS = {"Auto": None, "Daily": "D", "Weekly": "W", "Monthly": "M"}
+
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: row positions of `threshold` points that preserve the
+    # visual shape of the series (always including the first and last point)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.zeros(threshold, dtype=int)
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # The average of the next bucket is the third corner of the triangle
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    selected[-1] = n - 1
+    return selected
+
+
+@timed()
+def downsample(frame, x, y, resolution="Auto", max_points=MAX_POINTS):
+    # Resample to the chosen calendar resolution, then guarantee the point budget with LTTB.
+    # With several series each keeps its own shape, and the union of their points is charted.
+    y = [y] if isinstance(y, str) else list(y)
+    frame = frame[[x] + y]
+
+    rule = RESOLUTIONS[resolution]
+    if rule is not None:
+        frame = frame.set_index(x).resample(rule).mean().reset_index()
+    if len(frame) <= max_points:
+        return frame
+
+    if pd.api.types.is_datetime64_any_dtype(frame[x]):
+        positions = frame[x].to_numpy().astype("int64").astype(float)
+    else:
+        positions = np.arange(len(frame), dtype=float)
+
+    threshold = max(max_points // len(y), 3)
+    rows = np.unique(
+        np.concatenate(
+            [
+                lttb(positions, frame[column].fillna(0).to_numpy(dtype=float), threshold)
+                for column in y
+            ]
+        )
+    )
+    return frame.iloc[rows]
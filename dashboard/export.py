@@ -0,0 +1,414 @@
+import argparse
+import glob
+import html
+import json
+import os
+import runpy
+import sys
+import textwrap
+import time
+
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+from markdown_it import MarkdownIt
+from plotly.offline import get_plotlyjs
+
+from dashboard import artifact, pushdown, refresh
+from dashboard.artifact import source_signature
+from dashboard.atomic import replacing
+from dashboard.data import CACHE, resolve_sources, served, track_served
+from dashboard.precompute import JOBS
+
+EXPORT_DIR = os.environ.get("DASHBOARD_EXPORT", "export")
+
+# The page scripts live next to the package, whichever data directory the export runs from
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_DIR = os.path.join(APP_DIR, "dashboard")
+
+# The app's pages in navigation order. Pages that render one section at a time name the radio
+# picking it in `sections`; every option of it is exported in turn, except the `skip`ped ones,
+# e.g. a business picker whose default pick means nothing to a read-only viewer.
+PAGES = [
+    {"file": "0_🏠_Home.py", "output": "index.html"},
+    {
+        "file": "pages/1_📈_Search Business.py",
+        "output": "search-business.html",
+        "sections": "Section",
+        "skip": ["Specific Business"],
+    },
+    {"file": "pages/2_📊_Search Feature KPIs.py", "output": "search-feature-kpis.html"},
+]
+
+MAX_TABLE_ROWS = 500
+
+# Streamlit's markdown, with raw HTML only where a page allows it
+MARKDOWN = MarkdownIt("commonmark", {"html": False}).enable("table")
+UNSAFE_MARKDOWN = MarkdownIt("commonmark", {"html": True}).enable("table")
+
+STYLE = """
+body { font-family: sans-serif; max-width: 1200px; margin: 0 auto; padding: 0 24px 48px; }
+nav { padding: 16px 0; border-bottom: 1px solid #ddd; margin-bottom: 16px; }
+nav a { margin-right: 16px; }
+.alert { padding: 8px 16px; border-radius: 6px; margin: 16px 0; }
+.info { background: #e8f0fe; } .warning { background: #fff4e0; } .success { background: #e6f6ea; }
+.caption, footer { color: #666; font-size: 0.9em; }
+table.dataframe { border-collapse: collapse; font-size: 0.85em; }
+table.dataframe td, table.dataframe th { padding: 2px 8px; border-bottom: 1px solid #eee; }
+details { margin: 16px 0; }
+"""
+
+# Draws every chart from the figure JSON stored on its element
+CHARTS_SCRIPT = """
+for (const element of document.querySelectorAll("[data-figure]")) {
+  const figure = JSON.parse(element.dataset.figure);
+  Plotly.newPlot(element, figure.data, figure.layout, {responsive: true});
+}
+"""
+
+DOCUMENT_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>{style}</style>
+<script src="plotly.min.js"></script>
+</head>
+<body>
+<nav>{nav}</nav>
+{body}
+<footer>{footer}</footer>
+<script>{script}</script>
+</body>
+</html>
+"""
+
+
+def render_markdown(body, unsafe_allow_html=False):
+    # Streamlit dedents text before rendering it
+    body = textwrap.dedent(str(body)).strip()
+    return (UNSAFE_MARKDOWN if unsafe_allow_html else MARKDOWN).render(body)
+
+
+def render_table(data):
+    if isinstance(data, pd.Series):
+        data = data.to_frame()
+    return data.to_html(max_rows=MAX_TABLE_ROWS, border=0, classes="dataframe")
+
+
+class Block:
+    # A container element (expander, tab) that wraps whatever is written inside its `with`
+    def __init__(self, recorder, opening, closing):
+        self.recorder = recorder
+        self.opening = opening
+        self.closing = closing
+
+    def __enter__(self):
+        self.recorder.emit(self.opening)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.emit(self.closing)
+        return False
+
+
+class Recorder:
+    # Stands in for the streamlit module while a page script runs and turns each element into
+    # HTML. Widgets return their default value, or the value in `choices` for their label; the
+    # sidebar only holds widgets and status, so what is written to it is dropped.
+    def __init__(self, choices=None, discard=False):
+        self.choices = choices or {}
+        self.discard = discard
+        self.page_title = None
+        self.parts = []
+        self.marks = {}
+        self.sidebar = self if discard else Recorder(self.choices, discard=True)
+
+    def emit(self, fragment):
+        if not self.discard:
+            self.parts.append(fragment)
+
+    # Elements
+    def set_page_config(self, page_title=None, **kwargs):
+        self.page_title = page_title
+
+    def title(self, body, **kwargs):
+        self.emit(f"<h1>{html.escape(str(body))}</h1>")
+
+    def markdown(self, body, unsafe_allow_html=False, **kwargs):
+        self.emit(render_markdown(body, unsafe_allow_html))
+
+    def write(self, *args, unsafe_allow_html=False, **kwargs):
+        for arg in args:
+            if isinstance(arg, (pd.DataFrame, pd.Series)):
+                self.dataframe(arg)
+            elif unsafe_allow_html and str(arg).lstrip().startswith("<"):
+                # Rendered HTML, e.g. deal card grids, goes in as is
+                self.emit(str(arg))
+            else:
+                self.markdown(arg, unsafe_allow_html)
+
+    def alert(self, kind, body):
+        self.emit(f'<div class="alert {kind}">{render_markdown(body)}</div>')
+
+    def info(self, body, **kwargs):
+        self.alert("info", body)
+
+    def warning(self, body, **kwargs):
+        self.alert("warning", body)
+
+    def success(self, body, **kwargs):
+        self.alert("success", body)
+
+    def caption(self, body, **kwargs):
+        self.emit(f'<div class="caption">{render_markdown(body)}</div>')
+
+    def dataframe(self, data, **kwargs):
+        self.emit(render_table(data))
+
+    def plotly_chart(self, figure, **kwargs):
+        # Serialized once here, so viewers only draw it
+        figure = pio.to_json(figure, validate=False)
+        self.emit(f'<div class="chart" data-figure="{html.escape(figure)}"></div>')
+
+    def bar_chart(self, data, x=None, y=None, height=None, **kwargs):
+        self.plotly_chart(px.bar(data, x=x, y=y, height=height))
+
+    def line_chart(self, data, x=None, y=None, height=None, **kwargs):
+        self.plotly_chart(px.line(data, x=x, y=y, height=height))
+
+    def area_chart(self, data, x=None, y=None, height=None, **kwargs):
+        self.plotly_chart(px.area(data, x=x, y=y, height=height))
+
+    def expander(self, label, expanded=False, **kwargs):
+        opening = f"<details{' open' if expanded else ''}><summary>{html.escape(label)}</summary>"
+        return Block(self, opening, "</details>")
+
+    def tabs(self, labels):
+        return [
+            Block(self, f"<section><h2>{html.escape(label)}</h2>", "</section>") for label in labels
+        ]
+
+    # Widgets
+    def radio(self, label, options, index=0, **kwargs):
+        options = list(options)
+        # Where the output of each choice starts, for pages exported section by section
+        self.marks[label] = (options, len(self.parts))
+        return self.choices.get(label, options[index])
+
+    def selectbox(self, label, options, index=0, **kwargs):
+        options = list(options)
+        return self.choices.get(label, options[index] if options else None)
+
+    def multiselect(self, label, options, default=None, **kwargs):
+        return self.choices.get(label, list(default or []))
+
+    def number_input(self, label, min_value=None, max_value=None, value=None, **kwargs):
+        if value is None:
+            value = min_value if min_value is not None else 0.0
+        return self.choices.get(label, value)
+
+    def slider(self, label, min_value=None, max_value=None, value=None, **kwargs):
+        return self.choices.get(label, min_value if value is None else value)
+
+    def text_input(self, label, value="", **kwargs):
+        return self.choices.get(label, value)
+
+    def checkbox(self, label, value=False, **kwargs):
+        return self.choices.get(label, value)
+
+    def download_button(self, *args, **kwargs):
+        return False
+
+
+# Everything the pages call on the streamlit module
+STREAMLIT_API = [
+    "set_page_config",
+    "title",
+    "markdown",
+    "write",
+    "info",
+    "warning",
+    "success",
+    "caption",
+    "dataframe",
+    "plotly_chart",
+    "bar_chart",
+    "line_chart",
+    "area_chart",
+    "expander",
+    "tabs",
+    "radio",
+    "selectbox",
+    "multiselect",
+    "number_input",
+    "slider",
+    "text_input",
+    "checkbox",
+    "download_button",
+    "sidebar",
+]
+
+
+def run_page(file, choices=None):
+    # Run a page script against a recorder in place of streamlit's elements and widgets
+    import streamlit as st
+
+    recorder = Recorder(choices)
+    saved = {name: getattr(st, name) for name in STREAMLIT_API}
+    try:
+        for name in STREAMLIT_API:
+            setattr(st, name, getattr(recorder, name))
+        # Pages that track what they serve reset this themselves; the others serve nothing
+        track_served()
+        runpy.run_path(os.path.join(APP_DIR, file), run_name="__main__")
+    finally:
+        for name, value in saved.items():
+            setattr(st, name, value)
+    return recorder, served()
+
+
+def render_page(page):
+    # A page's HTML body and the data entries it was rendered from
+    recorder, entries = run_page(page["file"])
+    if "sections" not in page:
+        return recorder.page_title, "\n".join(recorder.parts), entries
+
+    # The output before the section picker is the page header, shared by every section
+    label = page["sections"]
+    options, start = recorder.marks[label]
+    parts = recorder.parts[:start]
+    for option in options:
+        if option in page.get("skip", []):
+            continue
+        if option != options[0]:
+            recorder, section_entries = run_page(page["file"], {label: option})
+            entries = entries + section_entries
+        parts.append(f"<section><h1>{html.escape(option)}</h1>")
+        parts.extend(recorder.parts[recorder.marks[label][1] :])
+        parts.append("</section>")
+    return recorder.page_title, "\n".join(parts), entries
+
+
+def format_time(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))
+
+
+def render_footer(entries, exported):
+    footer = f"Exported {format_time(exported)}"
+    version = refresh.data_version(entries)
+    if version is not None:
+        footer += (
+            f" from data version <code>{version['version']}</code>, built "
+            f"{format_time(version['built'])}"
+        )
+    return footer + "."
+
+
+def code_sources():
+    # The page scripts and the package code they render with
+    pages = [os.path.join(APP_DIR, page["file"]) for page in PAGES]
+    return pages + sorted(glob.glob(os.path.join(PACKAGE_DIR, "*.py")))
+
+
+def export_sources():
+    # Data files behind everything the pages show, and the code that renders them
+    sources = {
+        source for loader, args, kwargs in JOBS for source in resolve_sources(loader.sources)
+    }
+    return sorted(sources) + code_sources()
+
+
+def signatures():
+    # JSON-compatible, so they compare equal to the ones read back from the manifest
+    current = {}
+    for source in export_sources():
+        signature = source_signature(source)
+        current[source] = list(signature) if signature is not None else None
+    if pushdown.PUSHDOWN:
+        # The Search Business page then reads the query backend's tables, not the exports
+        current["query backend"] = pushdown.data_version()
+    return current
+
+
+def write_file(path, content):
+    # Write then rename, so viewers never get a half-written page
+    with replacing(path) as temporary:
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(content)
+
+
+def export(output=EXPORT_DIR, force=False):
+    # Render every page into static HTML under `output`, unless nothing they show has changed
+    # since the last export. Returns whether the pages were written.
+    manifest_path = os.path.join(output, "manifest.json")
+    current = signatures()
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path) as manifest:
+            if json.load(manifest)["sources"] == current:
+                return False
+
+    # Pages render once per export; there is nothing for a background refresher to keep fresh
+    refresh.REFRESH_SECONDS = 0
+    # Every export renders from freshly loaded data: query results would otherwise be served
+    # for their TTL past the table change that triggered it, and with pushdown the artifact
+    # can't tell that the tables changed
+    CACHE.clear()
+    if pushdown.PUSHDOWN:
+        artifact.ENABLED = False
+    os.makedirs(output, exist_ok=True)
+    plotly_js = os.path.join(output, "plotly.min.js")
+    if not os.path.exists(plotly_js):
+        write_file(plotly_js, get_plotlyjs())
+
+    exported = time.time()
+    rendered = [render_page(page) for page in PAGES]
+    nav = " ".join(
+        f'<a href="{page["output"]}">{html.escape(title or page["output"])}</a>'
+        for page, (title, body, entries) in zip(PAGES, rendered)
+    )
+    for page, (title, body, entries) in zip(PAGES, rendered):
+        document = DOCUMENT_TEMPLATE.format(
+            title=html.escape(title or ""),
+            style=STYLE,
+            nav=nav,
+            body=body,
+            footer=render_footer(entries, exported),
+            script=CHARTS_SCRIPT,
+        )
+        write_file(os.path.join(output, page["output"]), document)
+    write_file(manifest_path, json.dumps({"exported": exported, "sources": current}, indent=2))
+    return True
+
+
+def main():
+    # Run from the repo root; serve the output directory with any static file server, e.g.
+    #   python -m dashboard.export --watch 300
+    parser = argparse.ArgumentParser(description="Export the dashboard pages as static HTML.")
+    parser.add_argument("--output", default=EXPORT_DIR)
+    parser.add_argument("--force", action="store_true", help="export even if nothing changed")
+    parser.add_argument(
+        "--watch", type=float, default=0, help="check for changed data every this many seconds"
+    )
+    args = parser.parse_args()
+
+    force = args.force
+    code = [source_signature(source) for source in code_sources()]
+    while True:
+        start = time.perf_counter()
+        if export(args.output, force):
+            elapsed = time.perf_counter() - start
+            print(f"Exported {len(PAGES)} pages to {args.output} in {elapsed:.1f}s")
+        else:
+            print(f"{args.output} is up to date")
+        if not args.watch:
+            break
+        force = False
+        time.sleep(args.watch)
+        if [source_signature(source) for source in code_sources()] != code:
+            # Changed package code only takes effect in a new process, which exports with it
+            os.execv(sys.executable, [sys.executable, "-m", "dashboard.export", *sys.argv[1:]])
+
+
+if __name__ == "__main__":
+    main()
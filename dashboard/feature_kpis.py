@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.artifact import precomputed
+from dashboard.charts import top_n_per_parent
+from dashboard.data import read_data
+from dashboard.downsample import downsample
+from dashboard.narrative import feature_summary
+from dashboard.profiling import timed
+from dashboard.stream import fold_chunks, read_chunks, should_stream
+
+EXP_TRAINING_FILE = "data/experience_training.csv"
+SEARCH_MERCH_FILE = "data/search_merchandiser.csv"
+SEARCH_FIELDS_FILE = "data/searchable_fields.csv"
+SEARCH_APIS_FILE = "data/search_apis.csv"
+FILTER_SEARCH_BUSINESSES_FILE = "data/api_by_businesses.csv"
+
+# Only the columns this page uses are read from each source
+SEARCH_FIELDS_COLUMNS = [
+    "CALENDAR_DATE",
+    "TEXT_SEARCH",
+    "PHRASE_MATCH",
+    "NLP_FILTER",
+    "SEMANTIC_SEARCH",
+    "DOCUMENT_SEARCH",
+    "SORTABLE",
+    "FACET",
+    "STATICFILTER",
+]
+
+# Feature adoption KPIs, read from each feature's daily active users export. Growth compares the
+# mean of `metric` over the `current` most recent months against the `previous` months before.
+FEATURES = {
+    "Experience Training": {
+        "file": EXP_TRAINING_FILE,
+        "columns": ["DAUS", "MAUS"],
+        "metric": "MAUS",
+        "current": 6,
+        "previous": 6,
+    },
+    "Search Merchandiser": {
+        "file": SEARCH_MERCH_FILE,
+        "columns": ["DAUS", "MAUS"],
+        "metric": "MAUS",
+        "current": 2,
+        "previous": 12,
+    },
+}
+
+FEATURE_FILES = list(dict.fromkeys(feature["file"] for feature in FEATURES.values()))
+
+SEARCH_APIS_COLUMNS = [
+    "MONTH",
+    "SEARCHES",
+    "UNIVERSAL_SEARCHES",
+    "VERTICAL_SEARCHES",
+    "FILTER_SEARCH",
+]
+FILTER_SEARCH_BUSINESSES_COLUMNS = ["MONTH", "BUSINESS_ID", "NAME", "SEARCHES"]
+
+# Businesses charted per month in the Filter Search drilldown; the rest share one bucket
+API_TOP_K = 10
+API_OTHERS = "All others"
+
+
+##FEATURE ADOPTION
+@timed()
+@precomputed(*FEATURE_FILES)
+def load_feature_kpis(features=None):
+    # All registered features in one pass: one read per source file, one monthly resample
+    # and one batch of growth windows, however many features there are
+    features = FEATURES if features is None else features
+    frames = []
+    for name, feature in features.items():
+        frame = read_data(feature["file"], ["CALENDAR_DATE"] + feature["columns"])
+        frames.append(frame.assign(FEATURE=name))
+    daily = pd.concat(frames, ignore_index=True)
+    daily["FEATURE"] = pd.Categorical(daily["FEATURE"], categories=list(features))
+
+    # Calculate monthly active users using the last day of each month
+    dates = pd.to_datetime(daily["CALENDAR_DATE"])
+    months = dates.dt.to_period("M").rename("MONTH")
+    monthly = daily.groupby(["FEATURE", months], observed=True).last().sort_index().reset_index()
+    monthly["MONTH"] = monthly["MONTH"].dt.strftime("%Y-%m")
+
+    # Growth Metrics: mean of each feature's metric over its last `current` months, against the
+    # `previous` months before them
+    specs = list(features.values())
+    feature = monthly["FEATURE"]
+    codes = feature.cat.codes.to_numpy()
+    current = np.array([spec["current"] for spec in specs])[codes]
+    previous = np.array([spec["previous"] for spec in specs])[codes]
+    metrics = [spec["metric"] for spec in specs]
+    metric_values = monthly[sorted(set(metrics))]
+    columns = metric_values.columns.get_indexer(metrics)[codes]
+    metric = pd.Series(metric_values.to_numpy()[np.arange(len(monthly)), columns], monthly.index)
+    from_end = monthly.groupby("FEATURE", observed=True).cumcount(ascending=False).to_numpy()
+
+    windows = {
+        "CURRENT": from_end < current,
+        "PREVIOUS": (from_end >= current) & (from_end < current + previous),
+    }
+    growth = pd.DataFrame(
+        {
+            window: metric.where(mask).groupby(feature, observed=True).mean()
+            for window, mask in windows.items()
+        }
+    ).astype(int)
+    growth["GROWTH_PCT"] = (
+        (growth["CURRENT"] - growth["PREVIOUS"]) / growth["PREVIOUS"] * 100
+    ).round(2)
+    growth.index = growth.index.astype(str)
+
+    return monthly, growth
+
+
+##SEARCHABLE FIELDS
+@timed()
+@precomputed(SEARCH_FIELDS_FILE)
+def load_search_fields():
+    SEARCH_FIELDS = read_data(SEARCH_FIELDS_FILE, SEARCH_FIELDS_COLUMNS).copy()
+
+    # Convert dates to datetime
+    SEARCH_FIELDS["CALENDAR_DATE"] = pd.to_datetime(SEARCH_FIELDS["CALENDAR_DATE"])
+
+    return SEARCH_FIELDS
+
+
+@timed()
+@precomputed(SEARCH_FIELDS_FILE)
+def load_search_fields_chart(resolution):
+    # Daily history is resampled and downsampled to a fixed point budget before charting
+    return downsample(load_search_fields(), "CALENDAR_DATE", SEARCH_FIELDS_COLUMNS[1:], resolution)
+
+
+@timed()
+@precomputed(*FEATURE_FILES, SEARCH_FIELDS_FILE)
+def load_feature_summary():
+    # Figures and periods the summaries quote, computed once per version of the data
+    MONTHLY_FEATURES, FEATURE_GROWTH = load_feature_kpis()
+    return feature_summary(MONTHLY_FEATURES, FEATURE_GROWTH, load_search_fields())
+
+
+##SEARCH APIS
+@timed()
+@precomputed(SEARCH_APIS_FILE)
+def load_search_apis():
+    SEARCH_APIS = read_data(SEARCH_APIS_FILE, SEARCH_APIS_COLUMNS).copy()
+    SEARCH_APIS["MONTH"] = pd.to_datetime(SEARCH_APIS["MONTH"]).dt.strftime("%Y-%m")
+
+    return SEARCH_APIS
+
+
+##FILTER SEARCH BY BUSINESS
+def business_labels(names):
+    # `names`: each business' latest name by ID. Names several businesses share get the ID too.
+    shared = names.duplicated(keep=False)
+    return names.where(~shared, names + " (" + names.index.astype(str) + ")")
+
+
+@timed()
+@precomputed(FILTER_SEARCH_BUSINESSES_FILE)
+def load_filter_search_businesses(top_k=API_TOP_K):
+    # The export has a row per business and month, so it is only charted pre-aggregated: the
+    # exact top k businesses of each month plus one bucket for all the others
+    keys = ["MONTH", "BUSINESS_ID", "NAME"]
+    if should_stream(FILTER_SEARCH_BUSINESSES_FILE):
+        # Too large to read whole: fold it into monthly sums per business a chunk at a time
+        chunks = read_chunks(FILTER_SEARCH_BUSINESSES_FILE, FILTER_SEARCH_BUSINESSES_COLUMNS)
+        chunks = (chunk.assign(MONTH=chunk["MONTH"].dt.to_period("M")) for chunk in chunks)
+        MONTHLY = fold_chunks(chunks, keys, {"SEARCHES": "sum"})
+    else:
+        BUSINESSES = read_data(FILTER_SEARCH_BUSINESSES_FILE, FILTER_SEARCH_BUSINESSES_COLUMNS)
+        months = pd.to_datetime(BUSINESSES["MONTH"]).dt.to_period("M").rename("MONTH")
+        MONTHLY = BUSINESSES.groupby([months, *keys[1:]], observed=True)[["SEARCHES"]].sum()
+    MONTHLY = MONTHLY.sort_index().reset_index()
+
+    # Businesses are told apart by ID, so a renamed one stays one business, labelled with the
+    # name of its latest month
+    names = MONTHLY["NAME"].astype(object).groupby(MONTHLY["BUSINESS_ID"]).last()
+    MONTHLY = MONTHLY.groupby(["MONTH", "BUSINESS_ID"])[["SEARCHES"]].sum().reset_index()
+    MONTHLY.insert(2, "NAME", MONTHLY["BUSINESS_ID"].map(business_labels(names)))
+    TOP = top_n_per_parent(MONTHLY, "MONTH", "SEARCHES", n=top_k, other=API_OTHERS)
+
+    # Every month of each business that made some month's top k, busiest businesses first
+    LEADERS = MONTHLY[MONTHLY["NAME"].isin(TOP["NAME"])].copy()
+    LEADERS["TOTAL"] = LEADERS.groupby("BUSINESS_ID")["SEARCHES"].transform("sum")
+    LEADERS = LEADERS.sort_values(["TOTAL", "NAME", "MONTH"], ascending=[False, True, True])
+
+    for frame in [TOP, LEADERS]:
+        frame["MONTH"] = frame["MONTH"].dt.strftime("%Y-%m")
+    return TOP.reset_index(drop=True), LEADERS.reset_index(drop=True)
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+# Dimensions the pages can be filtered by. Business dimensions hold one value per business;
+# a business matches a quoteline dimension when any of its quotelines has a selected value.
+BUSINESS_FILTERS = ["INDUSTRY", "COUNTRY", "CLOSE_YEAR", "IS_ACTIVE"]
+QUOTELINE_FILTERS = ["TIER", "CONTRACT_TYPE"]
+FILTERS = BUSINESS_FILTERS + QUOTELINE_FILTERS
+
+# Keys of the business rows, which quotelines are matched to
+BUSINESS_KEYS = ["BUSINESS_ID", "NAME", "INDUSTRY", "COUNTRY"]
+
+
+class BitmapIndex:
+    # A packed bitmap of the rows holding each value of each dimension. A filter selects the OR
+    # of its values' bitmaps and filters are ANDed together, so any combination costs a few
+    # bitwise operations over rows / 8 bytes rather than a scan of the frame.
+    def __init__(self, size):
+        self.size = size
+        self.bitmaps = {}
+
+    def add(self, dimension, values, codes):
+        # `codes` gives each row's position in `values`, -1 for rows without a value
+        self.bitmaps[dimension] = {value: np.packbits(codes == i) for i, value in enumerate(values)}
+
+    def mask(self, filters):
+        # filters: {dimension: selected values}; a dimension with no values selected is ignored
+        mask = np.packbits(np.ones(self.size, dtype=bool))
+        for dimension, selected in filters.items():
+            if not selected:
+                continue
+            matching = np.zeros_like(mask)
+            for value in selected:
+                if value in self.bitmaps[dimension]:
+                    matching |= self.bitmaps[dimension][value]
+            mask &= matching
+        return np.unpackbits(mask, count=self.size).astype(bool)
+
+
+def filter_key(selections):
+    # Selected values per dimension as a hashable loader argument; () when nothing is filtered
+    return tuple(
+        (dimension, tuple(selections[dimension]))
+        for dimension in FILTERS
+        if selections.get(dimension)
+    )
+
+
+def value_codes(values):
+    # Distinct values in sorted order and each row's position among them
+    values = pd.Categorical(values)
+    if not values.categories.is_monotonic_increasing:
+        values = values.reorder_categories(values.categories.sort_values())
+    return values.categories.tolist(), values.codes.astype(np.int64)
+
+
+class FilterIndex:
+    # Bitmaps for every filter over both the quotelines and the businesses built from them.
+    # Quotelines inherit their business' CLOSE_YEAR and IS_ACTIVE.
+    def __init__(self, quotelines, businesses):
+        # The bitmaps are row positions, so rows are only ever picked from these frames: while
+        # the refresher rebuilds entries one by one, load_quotelines() may already return newer
+        self.frames = (quotelines, businesses)
+        self.quotelines = BitmapIndex(len(quotelines))
+        self.businesses = BitmapIndex(len(businesses))
+        self.options = {}
+
+        # Business row of each quoteline, -1 where its business was dropped
+        rows = businesses[BUSINESS_KEYS].assign(ROW=np.arange(len(businesses)))
+        owner = quotelines[BUSINESS_KEYS].merge(rows, how="left", on=BUSINESS_KEYS)["ROW"]
+        owner = owner.fillna(-1).to_numpy(dtype=np.int64)
+
+        for dimension in BUSINESS_FILTERS:
+            values, codes = value_codes(businesses[dimension])
+            self.options[dimension] = values
+            self.businesses.add(dimension, values, codes)
+            self.quotelines.add(dimension, values, np.where(owner >= 0, codes[owner], -1))
+
+        for dimension in QUOTELINE_FILTERS:
+            values, codes = value_codes(quotelines[dimension])
+            self.options[dimension] = values
+            self.quotelines.add(dimension, values, codes)
+            # A business holds a value when any of its quotelines does
+            bitmaps = self.businesses.bitmaps[dimension] = {}
+            for i, value in enumerate(values):
+                holds = np.zeros(len(businesses), dtype=bool)
+                holds[owner[(owner >= 0) & (codes == i)]] = True
+                bitmaps[value] = np.packbits(holds)
+
+    def select_quotelines(self, filters):
+        return self.frames[0][self.quotelines.mask(filters)]
+
+    def select_businesses(self, filters):
+        return self.frames[1][self.businesses.mask(filters)]
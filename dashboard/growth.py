@@ -0,0 +1,60 @@
+import numpy as np
+
+from dashboard.profiling import timed
+
+METRICS = ["MoM Growth", "YoY Growth", "DELTA", "CMGR", "CAGR"]
+
+# Trailing windows in months; None covers the full history
+WINDOWS = {"Last 12 Months": 12, "Last 24 Months": 24, "Last 36 Months": 36, "All Time": None}
+
+
+def period_growth(values, periods):
+    # Percent change against `periods` months earlier, NaN where there's no earlier month
+    growth = np.full(values.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth[periods:] = values[periods:] / values[:-periods] - 1
+    return growth
+
+
+def compound_growth(values, bases):
+    # Delta, CMGR and CAGR of every month against each window's base month, for all windows and
+    # series at once. `values` is (months, series) and the results are (windows, months, series).
+    rows = np.arange(len(values))
+    offsets = (rows[None, :] - bases[:, None])[:, :, None]
+    previous = np.vstack([values[:1], values[:-1]])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = values[None, :, :] / values[bases][:, None, :]
+        delta = np.where(offsets >= 1, values - previous, 0)
+        cmgr = ratio ** (1 / offsets) - 1
+        cagr = ratio ** (1 / (offsets / 12)) - 1
+    return delta, cmgr, cagr
+
+
+@timed()
+def growth_metrics(monthly, columns=("ACTIVE_ACV",), windows=WINDOWS):
+    # Returns one frame per window with the trailing months and their growth metrics. With more
+    # than one series, metric columns are prefixed with the series name, e.g. "EMEA CAGR".
+    columns = list(columns)
+    values = monthly[columns].to_numpy(dtype=float)
+    months = len(values)
+
+    # A trailing window of n months is measured from the month before it starts
+    bases = np.array(
+        [0 if window is None else max(months - 1 - window, 0) for window in windows.values()]
+    )
+    mom = period_growth(values, 1)
+    yoy = period_growth(values, 12)
+    delta, cmgr, cagr = compound_growth(values, bases)
+
+    frames = {}
+    for i, (name, window) in enumerate(windows.items()):
+        start = 0 if window is None else max(months - window, 0)
+        frame = monthly[["MONTH"] + columns].iloc[start:].reset_index(drop=True)
+        for j, column in enumerate(columns):
+            prefix = f"{column} " if len(columns) > 1 else ""
+            metrics = [mom, yoy, delta[i], cmgr[i], cagr[i]]
+            for metric, result in zip(METRICS, metrics):
+                frame[prefix + metric] = result[start:, j]
+        frames[name] = frame
+    return frames
@@ -0,0 +1,77 @@
+from collections import defaultdict
+from itertools import islice
+
+import numpy as np
+
+
+def trigrams(text):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class BusinessIndex:
+    # Each business' quoteline rows, plus name indexes for the business picker. Built once per
+    # data version and shared between sessions.
+
+    def __init__(self, quotelines, businesses):
+        # Row positions that order the quotelines by business and START_DATE, so each business'
+        # rows are one contiguous block without keeping a sorted copy of the frame. Without
+        # quotelines (when they are queried per business) the index only serves the picker. It
+        # keeps the frames it was built from, which its row positions refer to.
+        self.frames = (quotelines, businesses)
+        self.order = np.array([], dtype=int)
+        self.ranges = {}
+        if quotelines is not None:
+            self.index_quotelines(quotelines)
+
+        # Businesses ranked by TCV, which is also the order search results are returned in
+        ranked = businesses.sort_values("NET_TOTAL_USD", ascending=False, kind="mergesort")
+        ranked = ranked.drop_duplicates("BUSINESS_ID")
+        self.ids = ranked["BUSINESS_ID"].to_numpy()
+        self.names = dict(zip(self.ids.tolist(), ranked["NAME"].astype(str)))
+        self.lower_names = ranked["NAME"].astype(str).str.lower().to_numpy(dtype=object)
+
+        # Alphabetical order for prefix search, trigram postings for substring search
+        self.alphabetical = np.argsort(self.lower_names, kind="mergesort")
+        self.sorted_names = self.lower_names[self.alphabetical]
+        postings = defaultdict(list)
+        for rank, name in enumerate(self.lower_names):
+            for gram in trigrams(name):
+                postings[gram].append(rank)
+        self.postings = {gram: np.array(ranks) for gram, ranks in postings.items()}
+
+    def index_quotelines(self, quotelines):
+        keys = quotelines[["BUSINESS_ID", "START_DATE"]].reset_index(drop=True)
+        keys = keys.sort_values(["BUSINESS_ID", "START_DATE"], kind="mergesort")
+        self.order = keys.index.to_numpy()
+        ids = keys["BUSINESS_ID"].to_numpy()
+        boundaries = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+        starts = np.concatenate([[0], boundaries]).astype(int)
+        ends = np.concatenate([boundaries, [len(ids)]]).astype(int)
+        self.ranges = dict(zip(ids[starts].tolist(), zip(starts.tolist(), ends.tolist())))
+
+    def business_quotelines(self, business_id):
+        start, end = self.ranges.get(business_id, (0, 0))
+        return self.frames[0].iloc[self.order[start:end]]
+
+    def search(self, query, limit=50):
+        # IDs of the highest-TCV businesses whose name contains `query` (or starts with it, for
+        # queries shorter than a trigram)
+        query = query.strip().lower()
+        if not query:
+            ranks = np.arange(min(limit, len(self.ids)))
+        elif len(query) < 3:
+            start = np.searchsorted(self.sorted_names, query, side="left")
+            end = np.searchsorted(self.sorted_names, query + "\uffff", side="left")
+            ranks = np.sort(self.alphabetical[start:end])[:limit]
+        else:
+            lists = sorted(
+                (self.postings.get(gram, np.array([], dtype=int)) for gram in trigrams(query)),
+                key=len,
+            )
+            candidates = lists[0]
+            for ranks in lists[1:]:
+                candidates = np.intersect1d(candidates, ranks, assume_unique=True)
+            # Trigrams can match out of order, so confirm each candidate
+            matches = (rank for rank in candidates if query in self.lower_names[rank])
+            ranks = list(islice(matches, limit))
+        return self.ids[np.asarray(ranks, dtype=int)]
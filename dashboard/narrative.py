@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.cube import roll_up
+from dashboard.profiling import timed
+
+
+def reference_periods(months):
+    # The periods the summaries talk about, derived from the latest month with data ("YYYY-MM"):
+    # that month, the one before, the same month a year earlier, and the last complete year
+    latest = pd.Period(max(months), "M")
+    year = latest.year if latest.month == 12 else latest.year - 1
+    return {
+        "latest": latest,
+        "previous": latest - 1,
+        "year_ago": latest - 12,
+        "year": year,
+        "previous_year": year - 1,
+    }
+
+
+def format_month(period):
+    return period.strftime("%B %Y")
+
+
+def describe_growth(percentage):
+    if percentage < 0:
+        return "a decline"
+    if percentage < 10:
+        return "mild growth"
+    return "strong growth"
+
+
+@timed()
+def acv_summary(monthly_acv, last_12_acv):
+    # Every ACV figure of the Overall summary, looked up by month rather than by position
+    periods = reference_periods(monthly_acv["MONTH"])
+    by_month = monthly_acv.set_index("MONTH")
+    acv = by_month["ACTIVE_ACV"]
+    delta = by_month["DELTA"]
+    latest = by_month.loc[str(periods["latest"])]
+    years = pd.PeriodIndex(by_month.index, freq="M").year
+    return {
+        **periods,
+        "acv": latest["ACTIVE_ACV"],
+        "previous_acv": acv.get(str(periods["previous"]), np.nan),
+        "year_ago_acv": acv.get(str(periods["year_ago"]), np.nan),
+        "mom_growth": latest["MoM Growth"],
+        "yoy_growth": latest["YoY Growth"],
+        "cmgr_12": last_12_acv["CMGR"].iloc[-1],
+        "cagr_12": last_12_acv["CAGR"].iloc[-1],
+        "delta": latest["DELTA"],
+        "previous_delta": delta.get(str(periods["previous"]), np.nan),
+        "previous_year_mean_delta": delta[years == periods["previous_year"]].mean(),
+        "mean_delta": delta.mean(),
+    }
+
+
+@timed()
+def customer_summary(cube, year):
+    # Every figure of the Customer Summary, from one roll-up of the cube per dimension. `year`
+    # is the last complete year; sign-up years are compared against the one before.
+    industries = roll_up(cube, ["INDUSTRY"]).set_index("INDUSTRY")
+    regions = roll_up(cube, ["COUNTRY"]).set_index("COUNTRY")
+    years = roll_up(cube, ["CLOSE_YEAR"]).set_index("CLOSE_YEAR")
+    totals = roll_up(cube).iloc[0]
+
+    tcv = industries["NET_TOTAL_USD"].sort_values(ascending=False, kind="mergesort")
+    retention = years["CUSTOMER_RETENTION"]
+    year_tcv = years["NET_TOTAL_USD"]
+    # CLOSE_YEAR holds strings, e.g. "2022"
+    recent, earlier = str(year), str(year - 1)
+    return {
+        "largest_industries": [
+            {"industry": industry, "tcv": value, "share": value / tcv.sum()}
+            for industry, value in tcv.head(2).items()
+        ],
+        "retention": totals["CUSTOMER_RETENTION"],
+        "active": int(totals["ACTIVE"]),
+        "customers": int(totals["BUSINESS_ID"]),
+        "weakest_industry": industries["CUSTOMER_RETENTION"].idxmin(),
+        "weakest_region": regions["CUSTOMER_RETENTION"].idxmin(),
+        "retention_by_year": {
+            cohort: retention.get(cohort, np.nan) for cohort in [earlier, str(year - 2)]
+        },
+        "tcv_by_year": {cohort: year_tcv.get(cohort, 0) for cohort in [earlier, recent]},
+    }
+
+
+@timed()
+def feature_summary(monthly_features, feature_growth, search_fields):
+    # The Feature KPIs summaries: each feature's growth windows and the months they run to
+    return {
+        "features_month": pd.Period(monthly_features["MONTH"].max(), "M"),
+        "fields_month": pd.Period(search_fields["CALENDAR_DATE"].max(), "M"),
+        "growth": feature_growth.to_dict("index"),
+    }
@@ -0,0 +1,90 @@
+import argparse
+import time
+
+from dashboard import artifact, pushdown
+from dashboard.charts import TOP_N
+from dashboard.downsample import RESOLUTIONS
+from dashboard.feature_kpis import (
+    load_feature_kpis,
+    load_feature_summary,
+    load_filter_search_businesses,
+    load_search_apis,
+    load_search_fields,
+    load_search_fields_chart,
+)
+from dashboard.search_business import (
+    ACV_SEGMENTS,
+    current_date,
+    load_acv,
+    load_business_index,
+    load_customer_cube,
+    load_deals,
+    load_filter_index,
+    load_quotelines,
+    load_segment_acv,
+    load_summary,
+    load_total_tcv,
+    load_treemap,
+)
+
+TREEMAP_DEFAULTS = {"top_n": TOP_N, "filters": ()}
+
+# Loaders that hold the whole quotelines export in memory. With pushdown the pages never call
+# them, and a warehouse-only deployment has no export for them to read.
+IN_MEMORY_LOADERS = [load_quotelines, load_filter_index]
+
+
+def build_jobs(in_memory=not pushdown.PUSHDOWN, today=None):
+    # Every loader call the pages make with their default widget values. With no sidebar filters
+    # selected the pages pass filters=(), so results are stored under that argument; loaders
+    # that run up to today are called with the date the jobs are built on.
+    today = current_date() if today is None else today
+    jobs = [
+        (load_quotelines, (), {}),
+        (load_acv, (), {}),
+        (load_total_tcv, (), {}),
+        (load_filter_index, (), {}),
+        (load_customer_cube, (), {"filters": ()}),
+        (load_treemap, ("INDUSTRY", "NET_TOTAL_USD"), {"active_only": False, **TREEMAP_DEFAULTS}),
+        (load_treemap, ("CLOSE_YEAR", "ACV_USD"), {"active_only": True, **TREEMAP_DEFAULTS}),
+        (load_treemap, ("COUNTRY", "NET_TOTAL_USD"), {"active_only": False, **TREEMAP_DEFAULTS}),
+        (load_business_index, (), {}),
+        (load_deals, (), {"filters": ()}),
+        (load_summary, (), {"filters": ()}),
+        *[
+            (load_segment_acv, (dimension, today), {"filters": ()})
+            for dimension in ACV_SEGMENTS.values()
+        ],
+        (load_feature_kpis, (), {}),
+        (load_search_fields, (), {}),
+        (load_feature_summary, (), {}),
+        *[(load_search_fields_chart, (resolution,), {}) for resolution in RESOLUTIONS],
+        (load_search_apis, (), {}),
+        (load_filter_search_businesses, (), {}),
+    ]
+    if not in_memory:
+        jobs = [job for job in jobs if job[0] not in IN_MEMORY_LOADERS]
+    return jobs
+
+
+JOBS = build_jobs()
+
+
+def main():
+    # Run from the repo root, e.g. on a schedule after the data/ exports are refreshed:
+    #   python -m dashboard.precompute
+    parser = argparse.ArgumentParser(description="Precompute the dashboard snapshot artifact.")
+    parser.add_argument("--output", default=artifact.ARTIFACT_FILE)
+    args = parser.parse_args()
+
+    artifact.ENABLED = False
+    start = time.perf_counter()
+    result = artifact.write_artifact(JOBS, args.output)
+    print(
+        f"Wrote {len(result['results'])} results to {args.output} "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
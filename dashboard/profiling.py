@@ -0,0 +1,190 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+# When set, every profiled run is appended to this file as one JSON line
+PROFILE_LOG = os.environ.get("DASHBOARD_PROFILE_LOG")
+
+# Each Streamlit session runs its script in its own thread, so each thread records its own run
+_CURRENT = threading.local()
+
+# tracemalloc is process-wide: it runs while at least one run is measuring memory. Peaks are
+# then approximate when several sessions rerun at the same time.
+_TRACING_LOCK = threading.Lock()
+_TRACING_RUNS = 0
+
+
+class Run:
+    def __init__(self, page, memory=False):
+        self.page = page
+        self.memory = memory
+        self.started = time.time()
+        self.stages = []
+        self.stack = []
+        self.show = False
+
+    def to_dict(self):
+        return {
+            "page": self.page,
+            "started": self.started,
+            "memory": self.memory,
+            "stages": [
+                {key: value for key, value in record.items() if not key.startswith("_")}
+                for record in self.stages
+            ],
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2, default=str)
+
+    def to_frame(self):
+        return pd.DataFrame(self.to_dict()["stages"])
+
+
+def current_run():
+    return getattr(_CURRENT, "run", None)
+
+
+def start_run(page, memory=False):
+    global _TRACING_RUNS
+    finish_run()
+    if memory:
+        with _TRACING_LOCK:
+            if _TRACING_RUNS == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            _TRACING_RUNS += 1
+    _CURRENT.run = Run(page, memory)
+    return _CURRENT.run
+
+
+def finish_run():
+    global _TRACING_RUNS
+    run = current_run()
+    _CURRENT.run = None
+    if run is None:
+        return None
+
+    if run.memory:
+        with _TRACING_LOCK:
+            _TRACING_RUNS -= 1
+            if _TRACING_RUNS == 0:
+                tracemalloc.stop()
+    if PROFILE_LOG:
+        with open(PROFILE_LOG, "a") as log:
+            log.write(json.dumps(run.to_dict(), default=str) + "\n")
+    return run
+
+
+def count_rows(value):
+    # Rows in a frame, or in all frames of a tuple/list/dict; None for anything else
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, dict):
+        return count_rows(list(value.values()))
+    if isinstance(value, (tuple, list)):
+        counts = [count_rows(item) for item in value]
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    # Record wall time (and peak memory, when measured) of a block in the current run. The
+    # yielded record can be given "rows_out". Outside of a run this only yields a dummy record.
+    run = current_run()
+    if run is None:
+        yield {}
+        return
+
+    record = {"stage": name, "depth": len(run.stack), "rows_in": rows_in, "rows_out": None}
+    parent = run.stack[-1] if run.stack else None
+    run.stages.append(record)
+    run.stack.append(record)
+
+    memory = run.memory and tracemalloc.is_tracing()
+    if memory:
+        # Fold the peak so far into the enclosing stage before resetting it for this one
+        current, peak = tracemalloc.get_traced_memory()
+        if parent is not None:
+            parent["_peak"] = max(parent.get("_peak", 0), peak)
+        tracemalloc.reset_peak()
+        record["_start"] = record["_peak"] = current
+
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["seconds"] = round(time.perf_counter() - start, 6)
+        if memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            record["_peak"] = max(record["_peak"], peak)
+            record["peak_mb"] = round((record["_peak"] - record["_start"]) / 1e6, 3)
+            if parent is not None:
+                parent["_peak"] = max(parent.get("_peak", 0), record["_peak"])
+        run.stack.pop()
+
+
+def timed(name=None):
+    # Decorator form of stage(); rows in/out are counted from frame arguments and results
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name or func.__qualname__, count_rows(args)) as record:
+                result = func(*args, **kwargs)
+                record["rows_out"] = count_rows(result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def start_page(page):
+    # Timings are always recorded; memory is only measured while the debug panel is open
+    import streamlit as st
+
+    show = st.sidebar.checkbox("Show stage timings", key="profile_stages")
+    run = start_run(page, memory=show)
+    run.show = show
+    return run
+
+
+def finish_page(run):
+    import streamlit as st
+
+    from dashboard.data import CACHE
+
+    run = finish_run() or run
+    if not run.show:
+        return
+
+    with st.sidebar.expander("Stage timings", expanded=True):
+        stages = run.to_frame()
+        if stages.empty:
+            st.write("No stages were recorded.")
+            return
+        stages["stage"] = [
+            "\u2003" * depth + name for depth, name in stages[["depth", "stage"]].values
+        ]
+        total = stages.loc[stages["depth"] == 0, "seconds"].sum()
+        st.write(f"**{total:.3f}s** across {len(stages)} stages")
+        st.dataframe(stages.drop(columns="depth"), use_container_width=True)
+        st.download_button(
+            "Download JSON",
+            run.to_json(),
+            file_name=f"profile-{time.strftime('%Y%m%d-%H%M%S')}.json",
+            mime="application/json",
+        )
+
+    # Cached frames are shared by every session, so this is the resident data of the process
+    with st.sidebar.expander("Memory footprint"):
+        footprint = CACHE.footprint()
+        st.write(f"**{footprint['mb'].sum():,.1f} MB** of cached data")
+        st.dataframe(footprint, use_container_width=True)
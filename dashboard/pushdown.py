@@ -0,0 +1,245 @@
+import os
+
+import pandas as pd
+
+from dashboard.data import CACHE
+from dashboard.query import QUERY_TTL, get_backend, run_query
+from dashboard.sweep import TOTAL
+from dashboard.transforms import QUOTELINE_CATEGORIES, REGIONS, compact, finish_businesses
+
+# Run the Search Business aggregations in the query backend (Snowflake, or the local SQLite
+# stand-in built with `python -m dashboard.query`), so only aggregated rows are transferred
+PUSHDOWN = os.environ.get("DASHBOARD_PUSHDOWN") == "1"
+
+QUOTELINES_TABLE = "search_quotelines"
+DAILY_ACV_TABLE = "search_acv_by_date"
+
+# SQL that differs between backends. `row_order` breaks ties the way the pandas path does, by
+# export order: the local database keeps rows in export order, but warehouse tables have no row
+# order, so ties there come back in any order.
+DIALECTS = {
+    "sqlite": {
+        "month": "substr({}, 1, 7)",
+        "row_order": "{}.rowid",
+        "days": "julianday({1}) - julianday({0})",
+    },
+    "snowflake": {
+        "month": "TO_CHAR({}, 'YYYY-MM')",
+        "row_order": "NULL",
+        "days": "DATEDIFF(day, {0}, {1})",
+    },
+}
+
+DATE_COLUMNS = ["CLOSE_DATE", "START_DATE", "END_DATE", "FIRST_CLOSE_DATE"]
+
+
+def dialect(backend):
+    return DIALECTS[backend.name]
+
+
+def region(column="CURRENCY"):
+    cases = " ".join(f"WHEN '{currency}' THEN '{name}'" for currency, name in REGIONS.items())
+    return f"CASE {column} {cases} END"
+
+
+def quotelines_sql(columns, backend, business_ids=None):
+    # A `typed` table of the quotelines as prepare_quotelines() derives them: deals with TCV
+    # only, with their region, their business' first close date and whether they are that
+    # first deal. `business_ids` limits it to some businesses before anything is aggregated.
+    condition = ""
+    if business_ids is not None:
+        condition = f"IN ({', '.join(str(int(business_id)) for business_id in business_ids)})"
+        condition = f"AND BUSINESS_ID {condition}"
+    return f"""
+        WITH firsts AS (
+            SELECT BUSINESS_ID, MIN(CLOSE_DATE) AS FIRST_CLOSE_DATE
+            FROM {QUOTELINES_TABLE}
+            WHERE NET_TOTAL_USD > 0 {condition}
+            GROUP BY BUSINESS_ID
+        ), typed AS (
+            SELECT {", ".join("q." + column for column in columns)},
+                {region("q.CURRENCY")} AS COUNTRY,
+                {dialect(backend)["row_order"].format("q")} AS ROW_ORDER,
+                firsts.FIRST_CLOSE_DATE,
+                CASE WHEN q.CLOSE_DATE = firsts.FIRST_CLOSE_DATE THEN 'New Logo' ELSE 'Renewal' END
+                    AS CONTRACT_TYPE
+            FROM {QUOTELINES_TABLE} AS q
+            LEFT JOIN firsts ON q.BUSINESS_ID = firsts.BUSINESS_ID
+            WHERE q.NET_TOTAL_USD > 0 {condition.replace("BUSINESS_ID", "q.BUSINESS_ID")}
+        )
+    """
+
+
+def data_version(backend=None):
+    # Changes whenever the tables the Search Business page queries do
+    backend = backend or get_backend()
+    return backend.data_version([QUOTELINES_TABLE, DAILY_ACV_TABLE])
+
+
+def current_data_version(backend=None):
+    # data_version() as of at most a query TTL ago, cheap enough to check on every loader call
+    backend = backend or get_backend()
+    return CACHE.get_or_build(
+        ("data_version", backend.name), [], lambda: data_version(backend), QUERY_TTL, track=False
+    )
+
+
+def query(sql, params=(), backend=None):
+    return run_query(sql, params, backend).to_pandas()
+
+
+def typed_quotelines(frame, columns):
+    # Query results come back with text dates (SQLite) and plain strings; give them the types
+    # and column order of the pandas path's quotelines
+    frame = frame[columns + ["FIRST_CLOSE_DATE", "COUNTRY", "CONTRACT_TYPE"]].copy()
+    for column in DATE_COLUMNS:
+        frame[column] = pd.to_datetime(frame[column])
+    return compact(frame, QUOTELINE_CATEGORIES + ["COUNTRY", "CONTRACT_TYPE"], ["BUSINESS_ID"])
+
+
+def query_businesses(backend=None, today=None):
+    # build_businesses() as one GROUP BY: a row per business instead of per quoteline
+    backend = backend or get_backend()
+    businesses = query(
+        f"""
+        SELECT BUSINESS_ID, NAME, INDUSTRY, {region()} AS COUNTRY,
+            SUM(NET_TOTAL_USD) AS NET_TOTAL_USD,
+            MIN(CLOSE_DATE) AS CLOSE_DATE,
+            MIN(START_DATE) AS START_DATE,
+            MAX(END_DATE) AS END_DATE
+        FROM {QUOTELINES_TABLE}
+        WHERE NET_TOTAL_USD > 0
+            AND BUSINESS_ID IS NOT NULL AND NAME IS NOT NULL AND INDUSTRY IS NOT NULL
+            AND {region()} IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        ORDER BY 1, 2, 3, 4
+        """,
+        backend=backend,
+    )
+    for column in ["CLOSE_DATE", "START_DATE", "END_DATE"]:
+        businesses[column] = pd.to_datetime(businesses[column])
+    businesses = compact(businesses, ["NAME", "INDUSTRY", "COUNTRY"], ["BUSINESS_ID"])
+    return finish_businesses(businesses, today)
+
+
+def query_total_tcv(backend=None):
+    total = query(
+        f"SELECT SUM(NET_TOTAL_USD) AS TCV FROM {QUOTELINES_TABLE} WHERE NET_TOTAL_USD > 0",
+        backend=backend,
+    )
+    return float(total["TCV"].iloc[0] or 0)
+
+
+def query_recent_deals(columns, limit=20, backend=None):
+    # The most recently closed new logo and renewal deals, latest first
+    backend = backend or get_backend()
+    latest = """
+        SELECT * FROM (
+            SELECT * FROM typed
+            WHERE CONTRACT_TYPE = ?
+            ORDER BY CLOSE_DATE DESC NULLS LAST, ROW_ORDER
+            LIMIT ?
+        )
+    """
+    deals = query(
+        quotelines_sql(columns, backend)
+        + latest
+        + "UNION ALL"
+        + latest
+        + "ORDER BY CONTRACT_TYPE, CLOSE_DATE DESC NULLS LAST, ROW_ORDER",
+        ("New Logo", limit, "Renewal", limit),
+        backend,
+    )
+    deals = typed_quotelines(deals, columns)
+    return tuple(
+        deals[deals["CONTRACT_TYPE"] == contract_type].reset_index(drop=True)
+        for contract_type in ["New Logo", "Renewal"]
+    )
+
+
+def query_top_quotelines(columns, limit=10, backend=None):
+    # The businesses with the most TCV, ranked, and their quotelines in export order
+    backend = backend or get_backend()
+    top = query(
+        f"""
+        SELECT BUSINESS_ID, NAME, SUM(NET_TOTAL_USD) AS NET_TOTAL_USD
+        FROM {QUOTELINES_TABLE}
+        WHERE NET_TOTAL_USD > 0 AND BUSINESS_ID IS NOT NULL AND NAME IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 3 DESC, 1, 2
+        LIMIT ?
+        """,
+        (limit,),
+        backend,
+    )
+    ids = top["BUSINESS_ID"].unique()
+    quotelines = query(
+        quotelines_sql(columns, backend, ids) + "SELECT * FROM typed ORDER BY ROW_ORDER",
+        backend=backend,
+    )
+    ranking = pd.MultiIndex.from_frame(top[["BUSINESS_ID", "NAME"]])
+    return typed_quotelines(quotelines, columns), ranking
+
+
+def query_business_quotelines(business_id, columns, backend=None):
+    # One business' quotelines ordered by START_DATE, as BusinessIndex.business_quotelines()
+    backend = backend or get_backend()
+    quotelines = query(
+        quotelines_sql(columns, backend, [business_id])
+        + "SELECT * FROM typed ORDER BY START_DATE NULLS LAST, ROW_ORDER",
+        backend=backend,
+    )
+    return typed_quotelines(quotelines, columns)
+
+
+def query_acv_events(dimension=None, backend=None):
+    # acv_events() summed per date and segment: two rows per contract in the backend, a few per
+    # day over the wire
+    backend = backend or get_backend()
+    segment = {None: f"'{TOTAL}'", "COUNTRY": region()}.get(dimension, dimension)
+    acv = f"NET_TOTAL_USD / (({dialect(backend)['days'].format('START_DATE', 'END_DATE')}) / 365.0)"
+    events = query(
+        f"""
+        SELECT DATE, SEGMENT, SUM(CHANGE) AS CHANGE FROM (
+            SELECT START_DATE AS DATE, {segment} AS SEGMENT, {acv} AS CHANGE
+            FROM {QUOTELINES_TABLE}
+            WHERE NET_TOTAL_USD > 0 AND END_DATE > START_DATE
+            UNION ALL
+            SELECT END_DATE AS DATE, {segment} AS SEGMENT, -{acv} AS CHANGE
+            FROM {QUOTELINES_TABLE}
+            WHERE NET_TOTAL_USD > 0 AND END_DATE > START_DATE
+        )
+        WHERE SEGMENT IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        """,
+        backend=backend,
+    )
+    events["DATE"] = pd.to_datetime(events["DATE"])
+    return events
+
+
+def query_monthly_acv(value_columns=("ACTIVE_ACV",), backend=None):
+    # refresh_monthly_acv() in one query: each month's last daily value
+    backend = backend or get_backend()
+    month = dialect(backend)["month"].format("CALENDAR_DATE")
+    monthly = []
+    for column in value_columns:
+        values = query(
+            f"""
+            SELECT MONTH, {column} FROM (
+                SELECT {month} AS MONTH, {column}, ROW_NUMBER() OVER (
+                    PARTITION BY {month}
+                    ORDER BY CALENDAR_DATE DESC,
+                        {dialect(backend)["row_order"].format(DAILY_ACV_TABLE)} DESC
+                ) AS LATEST
+                FROM {DAILY_ACV_TABLE}
+                WHERE CALENDAR_DATE IS NOT NULL AND {column} IS NOT NULL
+            )
+            WHERE LATEST = 1
+            """,
+            backend=backend,
+        )
+        monthly.append(values.set_index("MONTH")[column])
+    monthly = pd.concat(monthly, axis=1).sort_index().rename_axis("MONTH").reset_index()
+    return monthly.astype({column: float for column in value_columns})
@@ -0,0 +1,179 @@
+import argparse
+import os
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+
+from dashboard.data import CACHE
+
+# Query results are cached for 10 min, keyed on the normalized SQL and its parameters
+QUERY_TTL = 600
+POOL_SIZE = int(os.environ.get("DASHBOARD_POOL_SIZE", 4))
+BATCH_SIZE = 50000
+
+# Local stand-in for the warehouse, built from the CSV exports with `python -m dashboard.query`
+LOCAL_DATABASE = os.environ.get("DASHBOARD_DB", "data/search.db")
+
+
+class ConnectionPool:
+    def __init__(self, connect, size=POOL_SIZE):
+        self.connect = connect
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        # At most `size` connections are checked out at once; idle ones are reused
+        with self.slots:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                conn = self.connect()
+            try:
+                yield conn
+            except Exception:
+                # Don't hand a connection in an unknown state to the next caller
+                conn.close()
+                raise
+            self.idle.put(conn)
+
+
+class SnowflakeBackend:
+    name = "snowflake"
+
+    def __init__(self, credentials, pool_size=POOL_SIZE):
+        import snowflake.connector
+
+        self.pool = ConnectionPool(
+            lambda: snowflake.connector.connect(
+                **credentials, paramstyle="qmark", client_session_keep_alive=True
+            ),
+            pool_size,
+        )
+
+    def data_version(self, tables):
+        # When each table last changed, from the warehouse's own metadata
+        placeholders = ", ".join("?" for _ in tables)
+        altered = self.execute(
+            "SELECT TABLE_NAME, LAST_ALTERED FROM INFORMATION_SCHEMA.TABLES"
+            f" WHERE TABLE_NAME IN ({placeholders}) ORDER BY 1",
+            [table.upper() for table in tables],
+        ).to_pydict()
+        return [[name, str(altered_at)] for name, altered_at in zip(*altered.values())]
+
+    def execute(self, sql, params=()):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                tables = list(cur.fetch_arrow_batches())
+                if not tables:
+                    return empty_table([column[0] for column in cur.description])
+                return pa.concat_tables(tables, promote_options="default")
+
+
+class SQLiteBackend:
+    name = "sqlite"
+
+    def __init__(self, path=LOCAL_DATABASE, pool_size=POOL_SIZE):
+        self.path = path
+        self.pool = ConnectionPool(
+            lambda: sqlite3.connect(path, check_same_thread=False), pool_size
+        )
+
+    def data_version(self, tables):
+        # Any write to the database file changes its size or modification time
+        stat = os.stat(self.path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def execute(self, sql, params=()):
+        with self.pool.connection() as conn:
+            cur = conn.execute(sql, params)
+            names = [column[0] for column in cur.description]
+            tables = []
+            while True:
+                rows = cur.fetchmany(BATCH_SIZE)
+                if not rows:
+                    break
+                tables.append(pa.table([pa.array(values) for values in zip(*rows)], names=names))
+            if not tables:
+                return empty_table(names)
+            return pa.concat_tables(tables, promote_options="default")
+
+
+def empty_table(names):
+    return pa.table([pa.array([], pa.null()) for _ in names], names=names)
+
+
+def normalize_sql(sql):
+    # Formatting differences shouldn't produce separate cache entries
+    return re.sub(r"\s+", " ", sql).strip().rstrip(";").strip()
+
+
+_BACKEND = None
+_BACKEND_LOCK = threading.Lock()
+
+
+def load_secrets():
+    import streamlit as st
+
+    try:
+        return dict(st.secrets)
+    except FileNotFoundError:
+        return {}
+
+
+def get_backend(secrets=None):
+    # Use Snowflake when credentials are configured, and the local database otherwise
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is None:
+            secrets = load_secrets() if secrets is None else secrets
+            if "snowflake" in secrets:
+                _BACKEND = SnowflakeBackend(dict(secrets["snowflake"]))
+            else:
+                _BACKEND = SQLiteBackend()
+        return _BACKEND
+
+
+def run_query(sql, params=(), backend=None, ttl=QUERY_TTL):
+    # Returns a pyarrow Table; call .to_pandas() for a dataframe
+    backend = backend or get_backend()
+    # Only the cache key is normalized: the query runs as written, string literals included
+    key = ("run_query", backend.name, normalize_sql(sql), tuple(params))
+    return CACHE.get_or_build(key, [], lambda: backend.execute(sql, params), ttl)
+
+
+def read_table(name, columns=None, backend=None):
+    select = ", ".join(columns) if columns is not None else "*"
+    return run_query(f"SELECT {select} FROM {name}", backend=backend).to_pandas()
+
+
+def build_local_database(data_dir="data", path=LOCAL_DATABASE):
+    # Load every CSV export into a table of the same name
+    with sqlite3.connect(path) as conn:
+        for file in sorted(os.listdir(data_dir)):
+            name, extension = os.path.splitext(file)
+            if extension == ".csv":
+                data = pd.read_csv(os.path.join(data_dir, file))
+                data.to_sql(name, conn, if_exists="replace", index=False, chunksize=BATCH_SIZE)
+                # Per-business lookups (e.g. a business' quotelines) use an index
+                if "BUSINESS_ID" in data:
+                    conn.execute(f"CREATE INDEX {name}_business ON {name} (BUSINESS_ID)")
+                print(f"{file} -> {path}:{name} ({len(data)} rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local stand-in query database.")
+    parser.add_argument("data_dir", nargs="?", default="data")
+    parser.add_argument("path", nargs="?", default=LOCAL_DATABASE)
+    args = parser.parse_args()
+    build_local_database(args.data_dir, args.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+
+from dashboard import data
+from dashboard.data import CACHE, served, track_served
+
+# How often the refresher checks the sources of everything the pages show; 0 turns it off, and
+# with it serving stale data, so every viewer waits for changed sources to be reloaded as before
+REFRESH_SECONDS = float(os.environ.get("DASHBOARD_REFRESH_SECONDS", 60))
+
+logger = logging.getLogger(__name__)
+
+
+class Refresher:
+    # One background thread per process. It rebuilds whatever viewers found stale, and every
+    # `interval` seconds rebuilds what the pages load by default and whatever else viewers used
+    # lately, when its sources changed or, for warehouse queries, its TTL expired. Rebuilt values
+    # replace the old ones atomically in the cache, so sessions keep rendering the previous
+    # version until then.
+    def __init__(self, cache=CACHE, interval=REFRESH_SECONDS, jobs=None):
+        self.cache = cache
+        self.interval = interval
+        self.jobs = jobs
+        self.queue = queue.Queue()
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.last_refresh = None
+        self.thread = threading.Thread(target=self.run, name="dashboard-refresher", daemon=True)
+
+    def start(self):
+        self.cache.revalidator = self
+        self.thread.start()
+        return self
+
+    def submit(self, key, rebuild):
+        # A stale entry is rebuilt once, however many viewers ask for it in the meantime
+        with self.lock:
+            if key in self.pending:
+                return
+            self.pending.add(key)
+        self.queue.put((key, rebuild))
+
+    def run(self):
+        # Lookups from this thread build stale entries rather than serving them
+        data._REFRESHING.active = True
+        next_refresh = time.monotonic()
+        while True:
+            try:
+                key, rebuild = self.queue.get(timeout=max(next_refresh - time.monotonic(), 0))
+            except queue.Empty:
+                self.refresh()
+                next_refresh = time.monotonic() + self.interval
+                continue
+            try:
+                rebuild()
+            except Exception:
+                # The stale value stays in place; the next refresh tries again
+                logger.exception("Refreshing %r failed", key)
+            finally:
+                with self.lock:
+                    self.pending.discard(key)
+
+    def refresh(self):
+        # Unused entries are dropped and unchanged ones renewed first, so the jobs below only
+        # rebuild what changed
+        stale = self.cache.sweep()
+        jobs = self.jobs
+        if jobs is None:
+            # Built on every pass, so loaders that run up to today move on with the date
+            from dashboard.precompute import build_jobs
+
+            jobs = build_jobs()
+        for loader, args, kwargs in jobs:
+            try:
+                loader(*args, **kwargs)
+            except Exception:
+                logger.exception("Refreshing %s failed", loader.__name__)
+        # Anything else that went stale, e.g. warehouse queries past their TTL
+        for key, sources, build, ttl in stale:
+            try:
+                self.cache.get_or_build(key, sources, build, ttl)
+            except Exception:
+                logger.exception("Refreshing %r failed", key)
+        self.last_refresh = time.time()
+
+
+_REFRESHER = None
+_REFRESHER_LOCK = threading.Lock()
+
+
+def start_refresher(interval=None):
+    # Started by the first page view of the process; later calls return the running refresher
+    global _REFRESHER
+    interval = REFRESH_SECONDS if interval is None else interval
+    with _REFRESHER_LOCK:
+        if _REFRESHER is None and interval > 0:
+            _REFRESHER = Refresher(interval=interval).start()
+        return _REFRESHER
+
+
+def data_version(entries=None):
+    # Version of the data a rerun rendered: a hash of the source signatures it was built from,
+    # and the age of its oldest part
+    entries = served() if entries is None else entries
+    if not entries:
+        return None
+    signatures = sorted({repr(entry["signature"]) for entry in entries})
+    return {
+        "version": hashlib.sha1("\n".join(signatures).encode()).hexdigest()[:8],
+        "built": min(entry["built"] for entry in entries),
+        "stale": any(entry["stale"] for entry in entries),
+    }
+
+
+def format_age(seconds):
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f} h"
+    return f"{seconds / 86400:.1f} days"
+
+
+def watch_data():
+    # Called at the top of a page: keeps the refresher running and records what this rerun serves
+    start_refresher()
+    track_served()
+
+
+def show_data_version():
+    import streamlit as st
+
+    version = data_version()
+    if version is None:
+        return
+    caption = (
+        f"Data version `{version['version']}`, "
+        f"built {format_age(time.time() - version['built'])} ago"
+    )
+    if version["stale"]:
+        caption += " (a newer version is being loaded)"
+    st.sidebar.caption(caption)
@@ -0,0 +1,121 @@
+import os
+
+import pandas as pd
+
+from dashboard.atomic import replacing
+from dashboard.profiling import timed
+from dashboard.snapshots import has_fresh_snapshot, load_snapshot, snapshot_path
+from dashboard.stream import complete_end, read_chunks
+
+# Bytes just before the last processed offset, used to detect a rewritten (not appended) file
+FINGERPRINT_BYTES = 256
+STATE_VERSION = 2
+
+
+def state_path(source):
+    return os.path.splitext(source)[0] + ".rollup.pkl"
+
+
+def empty_monthly(value_columns):
+    return pd.DataFrame(columns=["MONTH"] + value_columns)
+
+
+def empty_state(source, value_columns):
+    with open(source, "rb") as f:
+        header = f.readline()
+    return {
+        "version": STATE_VERSION,
+        "columns": header.decode().strip().split(","),
+        "value_columns": value_columns,
+        "offset": len(header),
+        "fingerprint": header[-FINGERPRINT_BYTES:],
+        "last_date": None,
+        "monthly": empty_monthly(value_columns),
+    }
+
+
+def load_state(source, value_columns, path):
+    state = pd.read_pickle(path) if os.path.exists(path) else None
+    if (
+        state is None
+        or state.get("version") != STATE_VERSION
+        or state["value_columns"] != value_columns
+        or not is_appended(source, state)
+    ):
+        return empty_state(source, value_columns)
+    return state
+
+
+def is_appended(source, state):
+    # The file may only have grown at the tail since it was last processed
+    offset = state["offset"]
+    if os.path.getsize(source) < offset:
+        return False
+    with open(source, "rb") as f:
+        if f.readline().decode().strip().split(",") != state["columns"]:
+            return False
+        fingerprint = state["fingerprint"]
+        f.seek(offset - len(fingerprint))
+        return f.read(len(fingerprint)) == fingerprint
+
+
+def read_fingerprint(source, end):
+    with open(source, "rb") as f:
+        f.seek(max(end - FINGERPRINT_BYTES, 0))
+        return f.read(end - f.tell())
+
+
+def ingest(monthly, daily, value_columns):
+    # Calculate monthly values using the last day of each month
+    daily = daily.assign(MONTH=daily["CALENDAR_DATE"].dt.strftime("%Y-%m"))
+    latest = daily.groupby("MONTH")[value_columns].last()
+
+    # Only the month in progress and any new months change; everything before is kept as is
+    first_month = latest.index[0]
+    unchanged = monthly[monthly["MONTH"] < first_month]
+    overlap = monthly[monthly["MONTH"] >= first_month].set_index("MONTH")[value_columns]
+    latest = latest.combine_first(overlap).reset_index()
+
+    monthly = pd.concat([unchanged, latest], ignore_index=True)
+    return monthly.astype({column: float for column in value_columns})
+
+
+@timed()
+def refresh_monthly_acv(source, value_columns=("ACTIVE_ACV",), path=None):
+    # Bring the persisted monthly rollup of a daily ACV export up to date with its new rows
+    value_columns = list(value_columns)
+    if not os.path.exists(source) and has_fresh_snapshot(source):
+        # Only the Arrow snapshot was deployed: there are no appended lines to follow, so the
+        # rollup is taken from the whole snapshot
+        daily = load_snapshot(snapshot_path(source), ["CALENDAR_DATE"] + value_columns)
+        daily = daily.sort_values("CALENDAR_DATE", kind="stable")
+        if not len(daily):
+            return empty_monthly(value_columns)
+        return ingest(empty_monthly(value_columns), daily, value_columns)
+
+    path = path or state_path(source)
+    state = load_state(source, value_columns, path)
+
+    # Only complete lines are consumed; a partially written last line waits for the next refresh
+    end = complete_end(source)
+    if end <= state["offset"]:
+        return state["monthly"]
+
+    # New lines are read in chunks, so the first build of a long export never holds it whole.
+    # The export is in date order: rows older than the last one ingested are skipped.
+    columns = ["CALENDAR_DATE"] + value_columns
+    for daily in read_chunks(source, columns, start=state["offset"], end=end):
+        if state["last_date"] is not None:
+            daily = daily[daily["CALENDAR_DATE"] > state["last_date"]]
+        daily = daily.sort_values("CALENDAR_DATE", kind="stable")
+
+        if len(daily):
+            state["monthly"] = ingest(state["monthly"], daily, value_columns)
+            state["last_date"] = daily["CALENDAR_DATE"].iloc[-1]
+    state["offset"] = end
+    state["fingerprint"] = read_fingerprint(source, end)
+
+    # Write to a temporary file first so a crash never leaves a corrupt state behind
+    with replacing(path) as temporary:
+        pd.to_pickle(state, temporary)
+    return state["monthly"]
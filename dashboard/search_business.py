@@ -0,0 +1,234 @@
+import pandas as pd
+
+from dashboard import pushdown
+from dashboard.artifact import precomputed
+from dashboard.charts import treemap_json
+from dashboard.cube import build_cube, roll_up
+from dashboard.data import read_data
+from dashboard.filters import FilterIndex
+from dashboard.growth import growth_metrics
+from dashboard.index import BusinessIndex
+from dashboard.narrative import acv_summary, customer_summary
+from dashboard.profiling import timed
+from dashboard.rollup import refresh_monthly_acv
+from dashboard.sweep import acv_events, month_ends, sweep_active_acv
+from dashboard.transforms import search_business_frames, trim_categories
+
+QUOTELINES_FILE = "data/search_quotelines.csv"
+DAILY_ACV_FILE = "data/search_acv_by_date.csv"
+
+# Dimensions the ACV history can be split by, swept from the quotelines' contract terms
+ACV_SEGMENTS = {"Industry": "INDUSTRY", "Region": "COUNTRY", "Tier": "TIER"}
+
+
+def exported(*files):
+    # Sources of a loader that reads these exports, or with pushdown queries the tables they
+    # were loaded into instead. It then has no file to follow and is rebuilt once its TTL
+    # expires, like the queries themselves.
+    return lambda: [] if pushdown.PUSHDOWN else list(files)
+
+
+# Only the columns this page uses are read from each source
+QUOTELINES_COLUMNS = [
+    "BUSINESS_ID",
+    "NAME",
+    "INDUSTRY",
+    "CURRENCY",
+    "TIER",
+    "ACCOUNT_TYPE",
+    "NET_TOTAL_USD",
+    "CLOSE_DATE",
+    "START_DATE",
+    "END_DATE",
+]
+
+
+@timed()
+@precomputed(QUOTELINES_FILE)
+def load_quotelines():
+    return search_business_frames(read_data(QUOTELINES_FILE, QUOTELINES_COLUMNS))
+
+
+@timed()
+@precomputed(exported(DAILY_ACV_FILE))
+def load_acv():
+    if pushdown.PUSHDOWN:
+        MONTHLY_ACV = pushdown.query_monthly_acv()
+    else:
+        # The monthly rollup persists between runs and only ingests days appended since the
+        # last one
+        MONTHLY_ACV = refresh_monthly_acv(DAILY_ACV_FILE)
+
+    # Calculate Delta, MoM/YoY growth, CMGR and CAGR for the last 12 months and all time
+    growth = growth_metrics(MONTHLY_ACV, windows={"Last 12 Months": 12, "All Time": None})
+    return growth["All Time"], growth["Last 12 Months"]
+
+
+def current_date():
+    # Loaders that run up to today take the date as an argument, so cached and precomputed
+    # results are keyed on the day they were computed for
+    return pd.Timestamp.today().normalize()
+
+
+@timed()
+@precomputed(exported(QUOTELINES_FILE))
+def load_segment_acv(dimension, today, filters=()):
+    # Monthly active ACV per value of `dimension` (in total when None) up to `today`, which the
+    # daily ACV export can't be split by
+    if pushdown.PUSHDOWN and not filters:
+        events = pushdown.query_acv_events(dimension)
+    else:
+        events = acv_events(filtered_quotelines(filters), dimension)
+    return month_ends(sweep_active_acv(events, end=today))
+
+
+@timed()
+@precomputed(exported(QUOTELINES_FILE))
+def load_businesses():
+    # With pushdown, the businesses are aggregated in the query backend and the quotelines are
+    # never loaded whole
+    if pushdown.PUSHDOWN:
+        return pushdown.query_businesses()
+    QUOTELINES, BUSINESSES = load_quotelines()
+    return BUSINESSES
+
+
+@timed()
+@precomputed(QUOTELINES_FILE)
+def load_filter_index():
+    QUOTELINES, BUSINESSES = load_quotelines()
+    return FilterIndex(QUOTELINES, BUSINESSES)
+
+
+def filtered_quotelines(filters):
+    # `filters` is a filter_key() tuple; matching rows are picked with the filter index's
+    # bitmaps rather than by comparing the frame's columns
+    if not filters:
+        QUOTELINES, BUSINESSES = load_quotelines()
+        return QUOTELINES
+    return load_filter_index().select_quotelines(dict(filters))
+
+
+def filtered_businesses(filters):
+    if not filters:
+        return load_businesses()
+    return load_filter_index().select_businesses(dict(filters))
+
+
+@timed()
+@precomputed(exported(QUOTELINES_FILE))
+def load_total_tcv():
+    if pushdown.PUSHDOWN:
+        return pushdown.query_total_tcv()
+    QUOTELINES, BUSINESSES = load_quotelines()
+    return float(QUOTELINES["NET_TOTAL_USD"].sum())
+
+
+@timed()
+@precomputed(exported(QUOTELINES_FILE))
+def load_customer_cube(filters=()):
+    return build_cube(filtered_businesses(filters))
+
+
+@timed()
+@precomputed(exported(QUOTELINES_FILE, DAILY_ACV_FILE))
+def load_summary(filters=()):
+    # Every figure the page's summaries quote, computed once per version of the data. The
+    # periods they refer to follow the latest month of ACV history; customer figures cover the
+    # businesses matching `filters`.
+    MONTHLY_ACV, LAST_12_ACV = load_acv()
+    summary = acv_summary(MONTHLY_ACV, LAST_12_ACV)
+    summary["tcv"] = load_total_tcv()
+    summary.update(customer_summary(load_customer_cube(filters), summary["year"]))
+    return summary
+
+
+def yoy_change(cube, dimension, year):
+    # Growth in cumulative TCV per dimension value, from the year before `year`
+    change = roll_up(cube, [dimension, "CLOSE_YEAR"])[[dimension, "CLOSE_YEAR", "NET_TOTAL_USD"]]
+    change["Cumulative TCV"] = change.groupby(dimension, observed=True)["NET_TOTAL_USD"].cumsum()
+    change["YoY Change"] = change.groupby(dimension, observed=True)["Cumulative TCV"].pct_change()
+    return change[change["CLOSE_YEAR"] == year]
+
+
+@timed()
+@precomputed(exported(QUOTELINES_FILE))
+def load_treemap(parent, value, active_only, top_n, filters=()):
+    BUSINESSES = filtered_businesses(filters)
+    if active_only:
+        BUSINESSES = BUSINESSES[BUSINESSES["IS_ACTIVE"]]
+    return treemap_json(BUSINESSES, parent, value, n=top_n)
+
+
+@timed()
+@precomputed(exported(QUOTELINES_FILE))
+def load_business_index():
+    if pushdown.PUSHDOWN:
+        return BusinessIndex(None, load_businesses())
+    QUOTELINES, BUSINESSES = load_quotelines()
+    return BusinessIndex(QUOTELINES, BUSINESSES)
+
+
+@timed()
+def load_business_quotelines(business_id):
+    # The quotelines of one business, ordered by START_DATE
+    if pushdown.PUSHDOWN:
+        return pushdown.query_business_quotelines(business_id, QUOTELINES_COLUMNS)
+    return load_business_index().business_quotelines(business_id)
+
+
+def aggregate_top_businesses(top_quotelines, top):
+    # One card per top business. "last" is slow on categorical columns, so this only ever
+    # sees the top businesses' quotelines.
+    top_businesses = (
+        top_quotelines.groupby(["BUSINESS_ID", "NAME"], observed=True)
+        .agg(
+            {
+                "NET_TOTAL_USD": "sum",
+                "START_DATE": "min",
+                "END_DATE": "max",
+                "CLOSE_DATE": "min",
+                "TIER": "last",
+            }
+        )
+        .reindex(top)
+    )
+    # Go from multi index to single index
+    return top_businesses.reset_index()
+
+
+@timed()
+@precomputed(exported(QUOTELINES_FILE))
+def load_deals(filters=()):
+    if pushdown.PUSHDOWN and not filters:
+        new_logos, renewals = pushdown.query_recent_deals(QUOTELINES_COLUMNS)
+        top_quotelines, top = pushdown.query_top_quotelines(QUOTELINES_COLUMNS)
+        top_businesses = aggregate_top_businesses(top_quotelines, top)
+        return (
+            trim_categories(new_logos),
+            trim_categories(renewals),
+            trim_categories(top_businesses),
+        )
+
+    QUOTELINES = filtered_quotelines(filters)
+
+    # The 20 most recently closed new logo and renewal deals; ties keep export order
+    new_logos = (
+        QUOTELINES[QUOTELINES["CONTRACT_TYPE"] == "New Logo"]
+        .sort_values("CLOSE_DATE", ascending=False, kind="mergesort")
+        .head(20)
+    )
+    renewals = (
+        QUOTELINES[QUOTELINES["CONTRACT_TYPE"] == "Renewal"]
+        .sort_values("CLOSE_DATE", ascending=False, kind="mergesort")
+        .head(20)
+    )
+
+    # The biggest businesses by total contract value (Sum of net_total_usd) all time
+    totals = QUOTELINES.groupby(["BUSINESS_ID", "NAME"], observed=True)[["NET_TOTAL_USD"]].sum()
+    top = totals.sort_index().sort_values("NET_TOTAL_USD", ascending=False, kind="mergesort")
+    top = top.head(10).index
+    top_quotelines = QUOTELINES[QUOTELINES["BUSINESS_ID"].isin(top.get_level_values(0))]
+    top_businesses = aggregate_top_businesses(top_quotelines, top)
+
+    return trim_categories(new_logos), trim_categories(renewals), trim_categories(top_businesses)
@@ -0,0 +1,102 @@
+import argparse
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+from dashboard.atomic import replacing
+
+# Typed schema for each export under data/. Dates are stored as datetime64 and low-cardinality
+# string columns are dictionary encoded, which pandas reads back as categoricals. Exports that
+# can grow large also pin their numeric dtypes and date format, so they parse the same way chunk
+# by chunk as they do whole.
+SCHEMAS = {
+    "search_quotelines": {
+        "dates": ["CLOSE_DATE", "START_DATE", "END_DATE"],
+        "categories": ["NAME", "INDUSTRY", "CURRENCY", "TIER", "ACCOUNT_TYPE"],
+    },
+    "search_acv_by_date": {
+        "dates": ["CALENDAR_DATE"],
+        "date_format": "%Y-%m-%d",
+        "dtypes": {"ACTIVE_ACV": "float64"},
+    },
+    "experience_training": {"dates": ["CALENDAR_DATE"]},
+    "search_merchandiser": {"dates": ["CALENDAR_DATE"]},
+    "searchable_fields": {"dates": ["CALENDAR_DATE"]},
+    "search_apis": {"dates": ["MONTH"]},
+    "api_by_businesses": {
+        "dates": ["MONTH"],
+        "date_format": "%Y-%m-%d",
+        "categories": ["NAME"],
+        "dtypes": {"BUSINESS_ID": "int64", "SEARCHES": "int64"},
+    },
+}
+
+
+def snapshot_path(file):
+    return os.path.splitext(file)[0] + ".arrow"
+
+
+def file_schema(file):
+    return SCHEMAS.get(os.path.splitext(os.path.basename(file))[0], {})
+
+
+def has_fresh_snapshot(file):
+    # A snapshot is only used while it is at least as new as the CSV it was built from
+    snapshot = snapshot_path(file)
+    if not os.path.exists(snapshot):
+        return False
+    return not os.path.exists(file) or os.stat(snapshot).st_mtime >= os.stat(file).st_mtime
+
+
+def read_csv(file, columns=None):
+    # Parse a CSV export straight into its schema's types, so it is never held as object strings
+    schema = file_schema(file)
+    header = pd.read_csv(file, nrows=0).columns
+    wanted = [column for column in header if columns is None or column in columns]
+
+    dtype = {column: "category" for column in schema.get("categories", []) if column in wanted}
+    dtype.update({c: t for c, t in schema.get("dtypes", {}).items() if c in wanted})
+    data = pd.read_csv(file, usecols=columns, dtype=dtype)
+    for column in schema.get("dates", []):
+        if column in wanted:
+            data[column] = pd.to_datetime(data[column], format=schema.get("date_format"))
+    return data
+
+
+def convert_csv(file):
+    data = read_csv(file)
+
+    # Write an uncompressed Arrow IPC file so it can be memory-mapped without decoding.
+    # Write to a temporary file first so readers never see a partial snapshot.
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    snapshot = snapshot_path(file)
+    with replacing(snapshot) as temporary:
+        with pa.OSFile(temporary, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    return snapshot
+
+
+def load_snapshot(snapshot, columns=None):
+    # Only the projected columns are paged in from the memory map and converted to pandas
+    with pa.memory_map(snapshot) as source:
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select([column for column in table.column_names if column in columns])
+        return table.to_pandas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert data/ CSV exports to Arrow snapshots.")
+    parser.add_argument("data_dir", nargs="?", default="data")
+    args = parser.parse_args()
+
+    for name in SCHEMAS:
+        file = os.path.join(args.data_dir, name + ".csv")
+        if os.path.exists(file):
+            print(f"{file} -> {convert_csv(file)}")
+
+
+if __name__ == "__main__":
+    main()
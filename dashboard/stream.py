@@ -0,0 +1,86 @@
+import io
+import os
+
+import pandas as pd
+
+from dashboard.snapshots import file_schema, has_fresh_snapshot
+
+# Sources at least this large are folded into their aggregates chunk by chunk rather than read
+# whole, unless they have an Arrow snapshot (which is memory-mapped instead of parsed)
+STREAM_MIN_BYTES = int(os.environ.get("DASHBOARD_STREAM_MB", 256)) * 1024 * 1024
+CHUNK_ROWS = int(os.environ.get("DASHBOARD_CHUNK_ROWS", 250000))
+
+# Block size used to scan back from the end of a file for its last complete line
+TAIL_BYTES = 64 * 1024
+
+
+def should_stream(file):
+    return not has_fresh_snapshot(file) and os.path.getsize(file) >= STREAM_MIN_BYTES
+
+
+def complete_end(file):
+    # Offset just past the last complete line; a partially written last line is left for later
+    with open(file, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(end - TAIL_BYTES, 0)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                return start + newline + 1
+            end = start
+    return 0
+
+
+class ByteRange(io.RawIOBase):
+    # Reads an open file from its current position up to `end`
+    def __init__(self, f, end):
+        self.f = f
+        self.end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.f.read(max(min(len(buffer), self.end - self.f.tell()), 0))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def read_chunks(file, columns=None, chunksize=CHUNK_ROWS, start=None, end=None):
+    # Parse a CSV export chunk by chunk with its schema's dtypes and date format. String columns
+    # stay plain objects, as each chunk would otherwise get its own categories. `start` and `end`
+    # restrict it to a byte range of complete lines after the header.
+    schema = file_schema(file)
+    header = list(pd.read_csv(file, nrows=0).columns)
+    wanted = [column for column in header if columns is None or column in columns]
+    dates = [column for column in schema.get("dates", []) if column in wanted]
+
+    with open(file, "rb") as f:
+        if start is not None:
+            f.seek(start)
+        source = f if end is None else io.BufferedReader(ByteRange(f, end))
+        reader = pd.read_csv(
+            source,
+            header=None if start is not None else "infer",
+            names=header if start is not None else None,
+            usecols=wanted,
+            dtype={c: t for c, t in schema.get("dtypes", {}).items() if c in wanted},
+            chunksize=chunksize,
+        )
+        for chunk in reader:
+            for column in dates:
+                chunk[column] = pd.to_datetime(chunk[column], format=schema.get("date_format"))
+            yield chunk
+
+
+def fold_chunks(chunks, keys, aggregations):
+    # Aggregate each chunk and merge it into the running result, so only one chunk and the
+    # aggregate are held at a time. Aggregations must merge with themselves (sum, min, max).
+    result = None
+    for chunk in chunks:
+        part = chunk.groupby(keys).agg(aggregations)
+        if result is not None:
+            part = pd.concat([result, part]).groupby(level=keys).agg(aggregations)
+        result = part
+    return result.sort_index()
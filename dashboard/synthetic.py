@@ -0,0 +1,231 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from dashboard.snapshots import convert_csv
+
+INDUSTRIES = [
+    "Healthcare",
+    "Financial Services",
+    "Manufacturing",
+    "Information",
+    "Retail",
+    "Food & Hospitality",
+    "Professional Services",
+    "Other",
+]
+CURRENCIES = ["USD", "CAD", "EUR", "GBP", "JPY"]
+CURRENCY_WEIGHTS = [0.6, 0.05, 0.15, 0.15, 0.05]
+TIERS = ["Answers Starter", "Answers Pro", "Answers Enterprise", "Answers Ultimate"]
+ACCOUNT_TYPES = ["Enterprise", "Mid-Market", "SMB", "Agency"]
+NAME_PREFIXES = ["North", "Blue", "Summit", "Pioneer", "Metro", "Golden", "Pacific", "Union"]
+NAME_NOUNS = ["Health", "Bank", "Motors", "Foods", "Realty", "Labs", "Outfitters", "Insurance"]
+NAME_SUFFIXES = ["Group", "Inc.", "LLC", "Partners", "Co.", "Holdings", "Systems", "Brands"]
+SEARCH_FIELDS = [
+    "TEXT_SEARCH",
+    "PHRASE_MATCH",
+    "NLP_FILTER",
+    "SEMANTIC_SEARCH",
+    "DOCUMENT_SEARCH",
+    "SORTABLE",
+    "FACET",
+    "STATICFILTER",
+]
+
+START = pd.Timestamp("2018-01-01")
+END = pd.Timestamp("2023-02-28")
+
+
+def business_names(ids, rng):
+    words = [
+        rng.choice(NAME_PREFIXES, len(ids)),
+        rng.choice(NAME_NOUNS, len(ids)),
+        rng.choice(NAME_SUFFIXES, len(ids)),
+    ]
+    # The ID keeps names unique, like the disambiguated account names in the real export
+    return pd.Series(words[0]).str.cat([words[1], words[2], ids.astype(str)], sep=" ").to_numpy()
+
+
+def generate_quotelines(rows, rng, start=START, end=END):
+    # Businesses sign a new logo deal and then renew roughly yearly, so a business' deals form
+    # a chain of consecutive contracts. About 2% of lines carry no TCV and 3% no industry.
+    deals = rng.geometric(0.35, size=rows // 2 + 1)
+    deals = deals[np.cumsum(deals) <= rows]
+    if deals.sum() < rows:
+        deals = np.append(deals, rows - deals.sum())
+    businesses = len(deals)
+    business_id = np.repeat(np.arange(businesses), deals)
+    deal_number = np.arange(rows) - np.repeat(np.cumsum(deals) - deals, deals)
+
+    industry = rng.choice(np.array(INDUSTRIES, dtype=object), businesses)
+    industry[rng.random(businesses) < 0.03] = None
+    currency = rng.choice(CURRENCIES, businesses, p=CURRENCY_WEIGHTS)
+    account_type = rng.choice(ACCOUNT_TYPES, businesses)
+    name = business_names(np.arange(businesses), rng)
+
+    span = (end - start).days
+    # Most chains of renewals end by `end`
+    first_close = (rng.random(businesses) * np.maximum(span - (deals - 1) * 365, 30)).astype(int)
+    close = first_close[business_id] + deal_number * 365 + rng.integers(-20, 20, rows)
+    contract_start = close + rng.integers(0, 30, rows)
+    term = rng.choice([365, 730, 1095], rows, p=[0.7, 0.2, 0.1])
+
+    tier = rng.choice(np.array(TIERS, dtype=object), rows)
+    tier[rng.random(rows) < 0.1] = None
+    value = np.round(rng.lognormal(10, 1.2, rows), 2)
+    value[rng.random(rows) < 0.02] = 0
+
+    return pd.DataFrame(
+        {
+            "BUSINESS_ID": business_id + 100000,
+            "NAME": name[business_id],
+            "INDUSTRY": industry[business_id],
+            "CURRENCY": currency[business_id],
+            "TIER": tier,
+            "ACCOUNT_TYPE": account_type[business_id],
+            "NET_TOTAL_USD": value,
+            "CLOSE_DATE": start + pd.to_timedelta(close, unit="D"),
+            "START_DATE": start + pd.to_timedelta(contract_start, unit="D"),
+            "END_DATE": start + pd.to_timedelta(contract_start + term, unit="D"),
+        }
+    )
+
+
+def generate_daily_acv(quotelines, start=START, end=END):
+    # ACV under contract on each day: each contract adds its annualized value on its start date
+    # and removes it on its end date
+    days = pd.date_range(start, end)
+    acv = quotelines["NET_TOTAL_USD"] / (
+        (quotelines["END_DATE"] - quotelines["START_DATE"]).dt.days / 365
+    )
+    changes = np.zeros(len(days) + 1)
+    for column, sign in [("START_DATE", 1), ("END_DATE", -1)]:
+        offsets = (quotelines[column] - start).dt.days.to_numpy()
+        np.add.at(changes, np.clip(offsets, 0, len(days)), sign * acv.to_numpy())
+    return pd.DataFrame({"CALENDAR_DATE": days, "ACTIVE_ACV": np.cumsum(changes)[:-1].round(2)})
+
+
+def seasonal_counts(days, base, growth, rng, scale=1):
+    # Daily usage: steady growth, a weekday/weekend cycle and multiplicative noise
+    trend = base * (1 + growth) ** (np.arange(len(days)) / 365)
+    weekly = np.where(days.dayofweek < 5, 1.0, 0.55)
+    noise = rng.lognormal(0, 0.15, len(days))
+    return np.round(trend * weekly * noise * scale).astype(int)
+
+
+def generate_active_users(rng, base, growth, start=START, end=END):
+    days = pd.date_range(start, end)
+    daus = seasonal_counts(days, base, growth, rng)
+    return pd.DataFrame(
+        {
+            "CALENDAR_DATE": days,
+            "DAUS": daus,
+            "MAUS": np.round(daus * rng.uniform(4, 6)).astype(int),
+        }
+    )
+
+
+def generate_searchable_fields(rng, start=START, end=END):
+    days = pd.date_range(start, end)
+    fields = {"CALENDAR_DATE": days}
+    for i, field in enumerate(SEARCH_FIELDS):
+        fields[field] = seasonal_counts(days, 2000 / (i + 1), rng.uniform(0, 0.5), rng)
+    return pd.DataFrame(fields)
+
+
+def generate_search_apis(rng, start=START, end=END):
+    months = pd.date_range(start, end, freq="MS")
+    searches = seasonal_counts(months, 5e7, 0.3, rng)
+    universal = np.round(searches * rng.uniform(0.55, 0.65, len(months))).astype(int)
+    return pd.DataFrame(
+        {
+            "MONTH": months,
+            "SEARCHES": searches,
+            "UNIVERSAL_SEARCHES": universal,
+            "VERTICAL_SEARCHES": searches - universal,
+            "FILTER_SEARCH": seasonal_counts(months, 2e5, 0.8, rng),
+        }
+    )
+
+
+def generate_api_by_businesses(quotelines, rng, start=START, end=END, adoption=0.1):
+    # Monthly Filter Search searches of the businesses that adopted it, for every month they
+    # were under contract
+    months = pd.date_range(start, end, freq="MS")
+    contracts = quotelines.groupby(["BUSINESS_ID", "NAME"]).agg(
+        START_DATE=("START_DATE", "min"), END_DATE=("END_DATE", "max")
+    )
+    contracts = contracts[rng.random(len(contracts)) < adoption]
+    starts = np.searchsorted(months, contracts["START_DATE"].to_numpy())
+    ends = np.searchsorted(months, contracts["END_DATE"].to_numpy())
+    counts = np.clip(ends - starts, 0, None)
+
+    rows = np.repeat(np.arange(len(contracts)), counts)
+    month = (
+        np.repeat(starts, counts)
+        + np.arange(len(rows))
+        - np.repeat(np.cumsum(counts) - counts, counts)
+    )
+    size = rng.lognormal(7, 1.5, len(contracts))
+    return pd.DataFrame(
+        {
+            "MONTH": months[month],
+            "BUSINESS_ID": contracts.index.get_level_values("BUSINESS_ID")[rows],
+            "NAME": contracts.index.get_level_values("NAME")[rows],
+            "SEARCHES": np.round(size[rows] * rng.lognormal(0, 0.3, len(rows))).astype(int),
+        }
+    )
+
+
+def generate(data_dir, rows=10000, seed=0, start=START, end=END, snapshots=False):
+    # Write synthetic versions of every export the pages read; `rows` sets the quoteline count
+    # and with it the business count, the daily ACV and the per-business API usage
+    rng = np.random.default_rng(seed)
+    quotelines = generate_quotelines(rows, rng, start, end)
+    frames = {
+        "search_quotelines": quotelines,
+        "search_acv_by_date": generate_daily_acv(quotelines, start, end),
+        "experience_training": generate_active_users(rng, 40, 0.1, start, end),
+        "search_merchandiser": generate_active_users(rng, 15, 0.6, start, end),
+        "searchable_fields": generate_searchable_fields(rng, start, end),
+        "search_apis": generate_search_apis(rng, start, end),
+        "api_by_businesses": generate_api_by_businesses(quotelines, rng, start, end),
+    }
+
+    os.makedirs(data_dir, exist_ok=True)
+    files = {}
+    for name, frame in frames.items():
+        file = os.path.join(data_dir, name + ".csv")
+        frame.to_csv(file, index=False, date_format="%Y-%m-%d")
+        if snapshots:
+            convert_csv(file)
+        files[file] = len(frame)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic dashboard data exports.")
+    parser.add_argument("data_dir", nargs="?", default="data")
+    parser.add_argument("--rows", type=int, default=10000, help="number of quotelines")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", default=str(START.date()))
+    parser.add_argument("--end", default=str(END.date()))
+    parser.add_argument("--snapshots", action="store_true", help="also write Arrow snapshots")
+    args = parser.parse_args()
+
+    files = generate(
+        args.data_dir,
+        args.rows,
+        args.seed,
+        pd.Timestamp(args.start),
+        pd.Timestamp(args.end),
+        args.snapshots,
+    )
+    for file, rows in files.items():
+        print(f"Wrote {rows:,} rows to {file}")
+
+
+if __name__ == "__main__":
+    main()
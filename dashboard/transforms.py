@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.profiling import stage, timed
+
+# Map quote currency to the region the business is billed in
+REGIONS = {"USD": "NA", "CAD": "NA", "EUR": "EMEA", "GBP": "EMEA", "JPY": "Japan"}
+
+# Repetitive string columns are held as categoricals, whichever way the data was read
+QUOTELINE_CATEGORIES = ["NAME", "INDUSTRY", "CURRENCY", "TIER", "ACCOUNT_TYPE"]
+
+
+def categorize(values):
+    # Only observed categories are kept, in sorted order, so sorting by them orders rows as
+    # plain strings would
+    values = values.astype("category").cat.remove_unused_categories()
+    categories = values.cat.categories
+    if not categories.is_monotonic_increasing:
+        values = values.cat.reorder_categories(categories.sort_values())
+    return values
+
+
+def compact(frame, categories=(), integers=()):
+    # Categorize string columns and downcast integer columns in place
+    for column in categories:
+        if column in frame:
+            frame[column] = categorize(frame[column])
+    for column in integers:
+        if column in frame and pd.api.types.is_integer_dtype(frame[column]):
+            frame[column] = pd.to_numeric(frame[column], downcast="integer")
+    return frame
+
+
+def trim_categories(frame):
+    # A small extract of a large frame shouldn't carry every category of the original
+    return frame.assign(
+        **{
+            column: frame[column].cat.remove_unused_categories()
+            for column in frame.columns
+            if isinstance(frame[column].dtype, pd.CategoricalDtype)
+        }
+    )
+
+
+@timed()
+def prepare_quotelines(quotelines):
+    # Filter out deals with no TCV (unrelated upgrades, cancellations, etc.)
+    quotelines = compact(
+        quotelines[quotelines["NET_TOTAL_USD"] > 0].copy(), QUOTELINE_CATEGORIES, ["BUSINESS_ID"]
+    )
+
+    # Convert dates to datetime
+    with stage("pd.to_datetime", len(quotelines)):
+        quotelines["CLOSE_DATE"] = pd.to_datetime(quotelines["CLOSE_DATE"])
+        quotelines["START_DATE"] = pd.to_datetime(quotelines["START_DATE"])
+        quotelines["END_DATE"] = pd.to_datetime(quotelines["END_DATE"])
+    quotelines["FIRST_CLOSE_DATE"] = quotelines.groupby("BUSINESS_ID", observed=True)[
+        "CLOSE_DATE"
+    ].transform("min")
+    quotelines["COUNTRY"] = categorize(quotelines["CURRENCY"].map(REGIONS))
+
+    # The first deal a business closed is its new logo deal, everything after is a renewal
+    quotelines["CONTRACT_TYPE"] = pd.Categorical(
+        np.where(quotelines["CLOSE_DATE"] == quotelines["FIRST_CLOSE_DATE"], "New Logo", "Renewal")
+    )
+    return quotelines
+
+
+@timed()
+def build_businesses(quotelines, today=None):
+    businesses = (
+        quotelines.groupby(["BUSINESS_ID", "NAME", "INDUSTRY", "COUNTRY"], observed=True)
+        .agg(
+            {
+                "NET_TOTAL_USD": "sum",
+                "CLOSE_DATE": "min",
+                "START_DATE": "min",
+                "END_DATE": "max",
+            }
+        )
+        # pandas 1.5 leaves observed categorical groups in order of appearance
+        .sort_index()
+        .reset_index()
+    )
+    return finish_businesses(businesses, today)
+
+
+def finish_businesses(businesses, today=None):
+    # Everything past the aggregation, shared with the aggregate computed in the warehouse
+    today = pd.to_datetime("today") if today is None else pd.to_datetime(today)
+    businesses = businesses[
+        (
+            ~businesses["INDUSTRY"].isnull()
+            & ~businesses["CLOSE_DATE"].isnull()
+            & ~businesses["COUNTRY"].isnull()
+        )
+    ].copy()
+
+    # Annualize TCV over the full span the business has been under contract
+    businesses["ACV_USD"] = businesses["NET_TOTAL_USD"] / (
+        (businesses["END_DATE"] - businesses["START_DATE"]).dt.days / 365
+    )
+    businesses["IS_ACTIVE"] = businesses["END_DATE"] >= today
+    businesses["CLOSE_YEAR"] = categorize(businesses["CLOSE_DATE"].dt.year.astype(str))
+    return businesses
+
+
+def search_business_frames(quotelines, today=None):
+    # Active businesses are selected with the IS_ACTIVE mask where needed rather than kept as
+    # a second copy
+    quotelines = prepare_quotelines(quotelines)
+    return quotelines, build_businesses(quotelines, today)
@@ -1,12 +1,35 @@
+import json
+import math
+
 import pandas as pd
 import streamlit as st
 
-# import snowflake.connector
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
-pd.options.mode.chained_assignment = None
+from dashboard import pushdown
+from dashboard.cards import card_grid
+from dashboard.charts import TOP_N
+from dashboard.cube import roll_up
+from dashboard.filters import filter_key
+from dashboard.narrative import format_month
+from dashboard.profiling import finish_page, stage, start_page
+from dashboard.refresh import show_data_version, watch_data
+from dashboard.search_business import (
+    ACV_SEGMENTS,
+    current_date,
+    load_acv,
+    load_business_index,
+    load_business_quotelines,
+    load_customer_cube,
+    load_deals,
+    load_filter_index,
+    load_segment_acv,
+    load_summary,
+    load_treemap,
+    yoy_change,
+)
 
 st.set_page_config(
     page_title="State of Search Business",
@@ -19,71 +42,52 @@ st.write("This dashboard shows the state of the Search business at Yext.")
 st.write("""---""")
 
 
-# Initialize connection.
-# Uses st.cache_resource to only run once.
-# @st.cache_resource
-# def init_connection():
-#     return snowflake.connector.connect(**st.secrets["snowflake"], client_session_keep_alive=True)
-
-
-# CONN = init_connection()
-
-# Perform query.
-# Uses st.cache_data to only rerun when the query changes or after 10 min.
-# @st.cache_data(ttl=600)
-# def run_query(query):
-#     with CONN.cursor() as cur:
-#         cur.execute(query)
-#         return cur.fetchall()
-
-
-def read_data(file):
-    return pd.read_csv(file)
-
-
-def deal_card(deal, color="#D3D3D3"):
-
-    business = deal["NAME"]
-    value = "${:,.0f}".format(deal["NET_TOTAL_USD"])
-    tier = deal["TIER"]
-    start_date = format_date(deal["START_DATE"])
-    end_date = format_date(deal["END_DATE"])
-    close_date = format_date(deal["CLOSE_DATE"])
-
-    return f"""
-    <div class="card" style="background-color: {color}; padding: 8px; margin:8px; width:300px; border-radius: 10px; display:flex;">
-        <div class="card-body" style="display: flex; flex-direction: column; justify-content: space-between; justify-content: space-between;">
-            <h5 class="card-title" style="color: black;">{business[:20] + "..." if len(business) > 20 else business}</h5>
-            <div class="card-text">
-                <p style="color: black;">
-                    <span>{value} TCV</span>
-                </p>
-                <p style="color: black;">
-                    <span>{tier if tier == tier else "Additional 2M Searches"}</span>
-                </p>
-                <p style="color: black;">
-                    <span>{start_date}</span>
-                    to
-                    <span>{end_date}</span>
-                </p>
-                <p style="color: black;">
-                    <span>Deal Closed {close_date}</span>
-                </p>
-            </div>
-        </div>
-    </div>
-    """
-
-
-def deal_grid(deals, color="#D3D3D3"):
-
-    cards = [deal_card(deal, color) for deal in deals.to_dict("records")]
-
-    return f"""
-    <div style="display: flex; flex-wrap: wrap;">
-        {''.join(cards)}
-    </div>
-    """
+CARDS_PER_PAGE = 24
+MAX_PICKER_OPTIONS = 50
+
+FILTER_LABELS = {
+    "INDUSTRY": "Industry",
+    "COUNTRY": "Region",
+    "CLOSE_YEAR": "Sign-up year",
+    "IS_ACTIVE": "Status",
+    "TIER": "Tier",
+    "CONTRACT_TYPE": "Contract type",
+}
+STATUSES = {True: "Active", False: "Churned"}
+
+
+def deal_grid(deals, color="#D3D3D3", key=None, page_size=CARDS_PER_PAGE):
+    # Grids longer than one page get a page picker, so only one page of cards is rendered
+    pages = max(math.ceil(len(deals) / page_size), 1)
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key=key)
+
+    return card_grid(deals.iloc[(page - 1) * page_size : page * page_size], color)
+
+
+def sidebar_filters():
+    # Filters shared by every section; a dimension with no values picked is not filtered
+    st.sidebar.write("## Filters")
+    if pushdown.PUSHDOWN:
+        st.sidebar.caption("Filtering needs the quotelines in memory, so it is off with pushdown.")
+        return ()
+
+    INDEX = load_filter_index()
+    selections = {
+        dimension: st.sidebar.multiselect(
+            label,
+            INDEX.options[dimension],
+            format_func=lambda value: STATUSES.get(value, value),
+            key=f"filter_{dimension}",
+        )
+        for dimension, label in FILTER_LABELS.items()
+    }
+    st.sidebar.caption(
+        "Filters apply to ACV by segment, the Customer Summary and the Deals. A business matches"
+        " a tier or contract type when any of its deals does."
+    )
+    return filter_key(selections)
 
 
 def format_date(date):
@@ -103,122 +107,35 @@ def format_percentage(value):
     return "{:.1%}".format(value)
 
 
-# Read quotelines file
-QUOTELINES = read_data("data/search_quotelines.csv")
-
-# Filter out deals with no TCV (unrelated upgrades, cancellations, etc.)
-QUOTELINES = QUOTELINES[QUOTELINES["NET_TOTAL_USD"] > 0]
-
-# Convert dates to datetime
-QUOTELINES["CLOSE_DATE"] = pd.to_datetime(QUOTELINES["CLOSE_DATE"])
-QUOTELINES["START_DATE"] = pd.to_datetime(QUOTELINES["START_DATE"])
-QUOTELINES["END_DATE"] = pd.to_datetime(QUOTELINES["END_DATE"])
-QUOTELINES["FIRST_CLOSE_DATE"] = QUOTELINES.groupby("BUSINESS_ID")["CLOSE_DATE"].transform("min")
-QUOTELINES["COUNTRY"] = QUOTELINES["CURRENCY"].map(
-    {"USD": "NA", "CAD": "NA", "EUR": "EMEA", "GBP": "EMEA", "JPY": "Japan"}
-)
-
-# Calculate additional contract details
-QUOTELINES["CONTRACT_TYPE"] = QUOTELINES.apply(
-    lambda row: "New Logo" if row["CLOSE_DATE"] == row["FIRST_CLOSE_DATE"] else "Renewal", axis=1
-)
-
-# Get businesses dataframe
-BUSINESSES = (
-    QUOTELINES.groupby(["BUSINESS_ID", "NAME", "INDUSTRY", "COUNTRY"])
-    .agg(
-        {
-            "NET_TOTAL_USD": "sum",
-            "CLOSE_DATE": "min",
-            "START_DATE": "min",
-            "END_DATE": "max",
-        }
-    )
-    .reset_index()
-)
-
-BUSINESSES["ACV_USD"] = BUSINESSES["NET_TOTAL_USD"] / (
-    (BUSINESSES["END_DATE"] - BUSINESSES["START_DATE"]).dt.days / 365
-)
-BUSINESSES["IS_ACTIVE"] = BUSINESSES["END_DATE"].apply(lambda x: x >= pd.to_datetime("today"))
-BUSINESSES["CLOSE_YEAR"] = pd.to_datetime(BUSINESSES["CLOSE_DATE"]).dt.strftime("%Y")
-BUSINESSES = BUSINESSES[
-    (
-        ~BUSINESSES["INDUSTRY"].isnull()
-        & ~BUSINESSES["CLOSE_DATE"].isnull()
-        & ~BUSINESSES["COUNTRY"].isnull()
-    )
-]
-ACTIVE_BUSINESSES = BUSINESSES[BUSINESSES["IS_ACTIVE"]]
-
-# Read daily ACV file
-DAILY_ACV = read_data("data/search_acv_by_date.csv")
-
-# Convert dates to datetime
-DAILY_ACV["CALENDAR_DATE"] = pd.to_datetime(DAILY_ACV["CALENDAR_DATE"])
-
-# Calculate monthly ACV using ACV of last day of each month
-DAILY_ACV["MONTH"] = pd.to_datetime(DAILY_ACV["CALENDAR_DATE"]).dt.strftime("%Y-%m")
-MONTHLY_ACV = DAILY_ACV.groupby("MONTH").last().reset_index()
-MONTHLY_ACV["MoM Growth"] = MONTHLY_ACV["ACTIVE_ACV"].pct_change()
-MONTHLY_ACV["YoY Growth"] = MONTHLY_ACV["ACTIVE_ACV"].pct_change(periods=12)
-
-# Calculate Delta, CAGR and CMGR for last 12 months
-LAST_12_ACV = MONTHLY_ACV.tail(13).reset_index()
-LAST_12_ACV.drop(["index", "CALENDAR_DATE"], axis=1, inplace=True)
-LAST_12_ACV["DELTA"] = [0] + [
-    LAST_12_ACV["ACTIVE_ACV"].iloc[i] - LAST_12_ACV["ACTIVE_ACV"].iloc[i - 1]
-    for i in range(1, len(LAST_12_ACV["ACTIVE_ACV"]))
-]
-LAST_12_ACV["CMGR"] = (LAST_12_ACV["ACTIVE_ACV"] / LAST_12_ACV["ACTIVE_ACV"].iloc[0]) ** (
-    1 / LAST_12_ACV.index
-) - 1
-LAST_12_ACV["CAGR"] = (LAST_12_ACV["ACTIVE_ACV"] / LAST_12_ACV["ACTIVE_ACV"].iloc[0]) ** (
-    1 / (LAST_12_ACV.index / 12)
-) - 1
-LAST_12_ACV = LAST_12_ACV.tail(12)
-
-# Calculate Delta, CAGR, CMGR for all time
-MONTHLY_ACV.drop(["CALENDAR_DATE"], axis=1, inplace=True)
-MONTHLY_ACV["DELTA"] = [0] + [
-    MONTHLY_ACV["ACTIVE_ACV"].iloc[i] - MONTHLY_ACV["ACTIVE_ACV"].iloc[i - 1]
-    for i in range(1, len(MONTHLY_ACV["ACTIVE_ACV"]))
-]
-MONTHLY_ACV["CMGR"] = (MONTHLY_ACV["ACTIVE_ACV"] / MONTHLY_ACV["ACTIVE_ACV"].iloc[0]) ** (
-    1 / MONTHLY_ACV.index
-) - 1
-MONTHLY_ACV["CAGR"] = (MONTHLY_ACV["ACTIVE_ACV"] / MONTHLY_ACV["ACTIVE_ACV"].iloc[0]) ** (
-    1 / (MONTHLY_ACV.index / 12)
-) - 1
-
-tabs = st.tabs(["Overall", "Customer Summary", "Deals", "Specific Business"])
-with tabs[0]:
+def overall_section():
+    MONTHLY_ACV, LAST_12_ACV = load_acv()
+    SUMMARY = load_summary()
 
     st.info(
         f"""
         ## Summary
-        #### As of February 2023, Yext Search has {format_usd(MONTHLY_ACV['ACTIVE_ACV'].iloc[-1])} in annual contract value (ACV).
-        This compares to **\{format_usd(MONTHLY_ACV['ACTIVE_ACV'].iloc[-2])} in January 2023**, or 
-        {format_percentage(MONTHLY_ACV['MoM Growth'].iloc[-1])} growth month-over-month (MoM); 
-        or, **\{format_usd(MONTHLY_ACV['ACTIVE_ACV'].iloc[-12])} in February 2022**, and 
-        {format_percentage(MONTHLY_ACV['YoY Growth'].iloc[-1])} growth year-over-year (YoY).
+        #### As of {format_month(SUMMARY["latest"])}, Yext Search has {format_usd(SUMMARY["acv"])} in annual contract value (ACV).
+        This compares to **\{format_usd(SUMMARY["previous_acv"])} in {format_month(SUMMARY["previous"])}**, or 
+        {format_percentage(SUMMARY["mom_growth"])} growth month-over-month (MoM); 
+        or, **\{format_usd(SUMMARY["year_ago_acv"])} in {format_month(SUMMARY["year_ago"])}**, and 
+        {format_percentage(SUMMARY["yoy_growth"])} growth year-over-year (YoY).
         
         [Coveo](https://ir.coveo.com/en/news-events/press-releases/detail/241/coveo-reports-fourth-quarter-and-fiscal-year-2022-financial) 
         reported **\$77.9M** in SaaS subscription revenue in FY22 with a growth rate of 41% YoY, and 
         [Algolia](https://getlatka.com/companies/algolia) reportedly has an annual revenue of **\$75M**.
 
-        #### Yext Search has captured \{format_usd(QUOTELINES['NET_TOTAL_USD'].sum())} in total contract value (TCV) since inception.
+        #### Yext Search has captured \{format_usd(SUMMARY["tcv"])} in total contract value (TCV) since inception.
         In the same ballpark timeframe, Reviews (Response, Monitoring, and Generation) captured 
         approximately **\$50-60M**, Pages captured about **\$80-100M**, and Listings captured **\$300M+**. 
         _Note this only includes contracts in Zuora, which was first implemented in 2020 and probably 
         disproportionally excludes other products._
 
-        #### Over the past 12 months, Yext Search has grown at a compound monthly growth rate (CMGR) of {format_percentage(LAST_12_ACV['CMGR'].iloc[-1])}, and a compound annual growth rate (CAGR) of {format_percentage(LAST_12_ACV['CAGR'].iloc[-1])}.
+        #### Over the past 12 months, Yext Search has grown at a compound monthly growth rate (CMGR) of {format_percentage(SUMMARY["cmgr_12"])}, and a compound annual growth rate (CAGR) of {format_percentage(SUMMARY["cagr_12"])}.
         This compares favorably to industry averages [published by SaaS Capital](https://www.saas-capital.com/research/2020-private-saas-company-growth-rate-benchmarks/), 
         which states that **startups between \$10M and \$20M in revenue average a growth rate of 43%**.
 
-        #### Last month, Yext Search closed \{format_usd(LAST_12_ACV["DELTA"].iloc[-1], round="K")} in incremental ACV, compared to \{format_usd(LAST_12_ACV["DELTA"].iloc[-2], round="K")} the previous month, or an average of \{format_usd(MONTHLY_ACV[pd.to_datetime(MONTHLY_ACV["MONTH"]).dt.year == 2021]["DELTA"].mean(), round="K")} in 2021.
-        Incremental ACV varies greatly month by month, but averages out to {format_usd(MONTHLY_ACV["DELTA"].mean(), round="K")} per month all-time.
+        #### Last month, Yext Search closed \{format_usd(SUMMARY["delta"], round="K")} in incremental ACV, compared to \{format_usd(SUMMARY["previous_delta"], round="K")} the previous month, or an average of \{format_usd(SUMMARY["previous_year_mean_delta"], round="K")} in {SUMMARY["previous_year"]}.
+        Incremental ACV varies greatly month by month, but averages out to {format_usd(SUMMARY["mean_delta"], round="K")} per month all-time.
         """
     )
     st.write("""---""")
@@ -265,24 +182,37 @@ with tabs[0]:
     with st.expander("Show Raw Data"):
         st.dataframe(MONTHLY_ACV)
 
-with tabs[1]:
+    st.write("## By Segment")
+    st.write(
+        "The ACV of active Search contracts each month up to today, split by segment. Computed"
+        " from each contract's start and end dates, so it may differ slightly from the totals"
+        " above."
+    )
+    segment = st.radio("Segment", list(ACV_SEGMENTS), horizontal=True, key="acv_segment")
+    SEGMENT_ACV = load_segment_acv(ACV_SEGMENTS[segment], current_date(), filters=FILTERS)
+    if len(SEGMENT_ACV.columns) == 1:
+        st.warning("No contracts match the filters.")
+        return
+    st.area_chart(SEGMENT_ACV, x="MONTH", y=list(SEGMENT_ACV.columns[1:]), height=500)
+
+    with st.expander("Show Raw Data"):
+        st.dataframe(SEGMENT_ACV)
+
+
+def customer_summary_section():
+    CUBE = load_customer_cube(filters=FILTERS)
+    if CUBE.empty:
+        st.warning("No businesses match the filters.")
+        return
+    SUMMARY = load_summary(filters=FILTERS)
+
+    # Sign-up years are compared between the last complete year and the one before
+    (earlier, earlier_tcv), (recent, recent_tcv) = SUMMARY["tcv_by_year"].items()
 
     # Compute dataframes for Industries
-    industries = BUSINESSES.groupby(["INDUSTRY"]).agg({"NET_TOTAL_USD": "sum"}).reset_index()
-    industries.sort_values("NET_TOTAL_USD", ascending=False, inplace=True)
-    retention_i = (
-        BUSINESSES.groupby(["INDUSTRY"])
-        .agg({"BUSINESS_ID": "count", "NET_TOTAL_USD": "sum", "IS_ACTIVE": "mean"})
-        .reset_index()
-    )
-    retention_i.sort_values("NET_TOTAL_USD", ascending=False, inplace=True)
-    retention_i.rename({"IS_ACTIVE": "CUSTOMER_RETENTION"}, axis=1, inplace=True)
-    change = (
-        BUSINESSES.groupby(["INDUSTRY", "CLOSE_YEAR"]).agg({"NET_TOTAL_USD": "sum"}).reset_index()
-    )
-    change["Cumulative TCV"] = change.groupby("INDUSTRY")["NET_TOTAL_USD"].cumsum()
-    change["YoY Change"] = change.groupby("INDUSTRY")["Cumulative TCV"].pct_change()
-    change = change[change["CLOSE_YEAR"] == "2022"]
+    industries = roll_up(CUBE, ["INDUSTRY"]).sort_values("NET_TOTAL_USD", ascending=False)
+    retention_i = industries
+    change = yoy_change(CUBE, "INDUSTRY", recent)
     # Sort into Healthcare, Financial Services, Manufacturing, Information, Retail, Food & Hospitality
     change["INDUSTRY"] = pd.Categorical(
         change["INDUSTRY"],
@@ -298,60 +228,58 @@ with tabs[1]:
     change.sort_values("INDUSTRY", inplace=True)
 
     # Compute data frames for Sign-up Year
-    retention_y = (
-        BUSINESSES.groupby(["CLOSE_YEAR"])
-        .agg({"BUSINESS_ID": "count", "NET_TOTAL_USD": "sum", "IS_ACTIVE": "mean"})
-        .reset_index()
-    )
-    retention_y.sort_values("NET_TOTAL_USD", ascending=False, inplace=True)
-    retention_y.rename({"IS_ACTIVE": "CUSTOMER_RETENTION"}, axis=1, inplace=True)
+    retention_y = roll_up(CUBE, ["CLOSE_YEAR"]).sort_values("NET_TOTAL_USD", ascending=False)
 
     # Compute data frames for Region
-    retention_r = (
-        BUSINESSES.groupby(["COUNTRY"])
-        .agg({"BUSINESS_ID": "count", "NET_TOTAL_USD": "sum", "IS_ACTIVE": "mean"})
-        .reset_index()
+    retention_r = roll_up(CUBE, ["COUNTRY"]).sort_values("NET_TOTAL_USD", ascending=False)
+    change_r = yoy_change(CUBE, "COUNTRY", recent)
+
+    # Summary phrases
+    largest = SUMMARY["largest_industries"]
+    largest_figures = " and ".join(
+        f"\\{format_usd(industry['tcv'])} ({format_percentage(industry['share'])} of TCV)"
+        for industry in largest
     )
-    retention_r.sort_values("NET_TOTAL_USD", ascending=False, inplace=True)
-    retention_r.rename({"IS_ACTIVE": "CUSTOMER_RETENTION"}, axis=1, inplace=True)
-    change_r = (
-        BUSINESSES.groupby(["COUNTRY", "CLOSE_YEAR"]).agg({"NET_TOTAL_USD": "sum"}).reset_index()
-    )
-    change_r["Cumulative TCV"] = change_r.groupby("COUNTRY")["NET_TOTAL_USD"].cumsum()
-    change_r["YoY Change"] = change_r.groupby("COUNTRY")["Cumulative TCV"].pct_change()
-    change_r = change_r[change_r["CLOSE_YEAR"] == "2022"]
+    if len(largest) == 1:
+        largest_industries = f"{largest[0]['industry']} represents the largest industry"
+    else:
+        largest_industries = (
+            f"{largest[0]['industry']} and {largest[1]['industry']} represent the largest"
+            " industries"
+        )
+        largest_figures += ", respectively"
+    (cohort, cohort_retention), (older_cohort, older_retention) = SUMMARY[
+        "retention_by_year"
+    ].items()
+    top_year, other_year = (earlier, recent) if earlier_tcv >= recent_tcv else (recent, earlier)
 
     st.info(
         f"""
         ## Summary
-        #### Healthcare and Financial Services represent the largest industries for Yext Search, with \{format_usd(industries[industries["INDUSTRY"] == "Financial Services"]['NET_TOTAL_USD'].sum())} ({format_percentage(ACTIVE_BUSINESSES[ACTIVE_BUSINESSES['INDUSTRY'] == 'Financial Services']['NET_TOTAL_USD'].sum() / ACTIVE_BUSINESSES['NET_TOTAL_USD'].sum())} of TCV) and \{format_usd(ACTIVE_BUSINESSES[ACTIVE_BUSINESSES['INDUSTRY'] == 'Healthcare']['NET_TOTAL_USD'].sum())} ({format_percentage(ACTIVE_BUSINESSES[ACTIVE_BUSINESSES['INDUSTRY'] == 'Healthcare']['NET_TOTAL_USD'].sum() / ACTIVE_BUSINESSES['NET_TOTAL_USD'].sum())} of TCV), respectively.
+        #### {largest_industries} for Yext Search, with {largest_figures}.
         However, Yext Search has sizeable customers across all industries.
 
-        #### Overall, customer retention is {format_percentage(BUSINESSES["IS_ACTIVE"].mean())} (i.e. {BUSINESSES["IS_ACTIVE"].sum()} of {BUSINESSES["BUSINESS_ID"].count()} customers are active).
+        #### Overall, customer retention is {format_percentage(SUMMARY["retention"])} (i.e. {SUMMARY["active"]} of {SUMMARY["customers"]} customers are active).
         This is below [industry averages](https://userpilot.com/blog/good-retention-rates-in-saas/#:~:text=The%20monthly%20average%20churn%20rate,range%20of%2092%2D97%20%25.) 
-        of 92-97%. Particular weak spots include in Retail and EMEA.
-        Notably, we have retained {format_percentage(retention_y[retention_y["CLOSE_YEAR"] == "2021"]["CUSTOMER_RETENTION"].mean())} of customers acquired in 2021, 
-        and {format_percentage(retention_y[retention_y["CLOSE_YEAR"] == "2020"]["CUSTOMER_RETENTION"].mean())} of customers acquired in 2020.
+        of 92-97%. Particular weak spots include in {SUMMARY["weakest_industry"]} and {SUMMARY["weakest_region"]}.
+        Notably, we have retained {format_percentage(cohort_retention)} of customers acquired in {cohort}, 
+        and {format_percentage(older_retention)} of customers acquired in {older_cohort}.
         
 
-        #### Most TCV today was acquired in 2021, not 2022. \{format_usd(BUSINESSES[BUSINESSES["CLOSE_YEAR"] == '2021']['NET_TOTAL_USD'].sum())} TCV was acquired in 2021, compared to \{format_usd(BUSINESSES[BUSINESSES["CLOSE_YEAR"] == '2022']['NET_TOTAL_USD'].sum())} in 2022.
+        #### Most TCV today was acquired in {top_year}, not {other_year}. \{format_usd(earlier_tcv)} TCV was acquired in {earlier}, compared to \{format_usd(recent_tcv)} in {recent}.
         This slowdown does align with strategic decisions to re-focus on core products like Listings, instead of viewing Search as the primary growth engine of the business.
     """
     )
 
+    # Treemaps show the largest businesses of each group and roll the rest up into "Other"
+    top_n = st.slider("Businesses shown per group in treemaps", 5, 100, TOP_N, step=5)
+
     # Customer metrics by Industry
     st.write("## Industry")
     st.write("### TCV by Industry")
 
-    fig = px.treemap(
-        BUSINESSES,
-        path=[px.Constant("All"), "INDUSTRY", "NAME"],
-        values="NET_TOTAL_USD",
-        color="INDUSTRY",
-        color_discrete_sequence=px.colors.qualitative.Pastel,
-        height=1000,
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    fig = load_treemap("INDUSTRY", "NET_TOTAL_USD", active_only=False, top_n=top_n, filters=FILTERS)
+    st.plotly_chart(json.loads(fig), use_container_width=True)
 
     st.write("### Industries with \$2M+ in TCV")
     bar = px.bar(industries.head(6), x="INDUSTRY", y="NET_TOTAL_USD", height=500)
@@ -361,26 +289,16 @@ with tabs[1]:
     bar = px.bar(retention_i.head(6), x="INDUSTRY", y="CUSTOMER_RETENTION", height=500)
     st.plotly_chart(bar, use_container_width=True)
 
-    st.write("### Change in TCV by Industry (% YoY, 2021 to 2022)")
+    st.write(f"### Change in TCV by Industry (% YoY, {earlier} to {recent})")
     bar = px.bar(change, x="INDUSTRY", y="YoY Change", height=500)
     st.plotly_chart(bar, use_container_width=True)
 
     # Customer metrics by Sign-up Year
     st.write("## Sign-up Year")
     st.write("### Active ACV by Sign-up Year")
-    fig = px.treemap(
-        ACTIVE_BUSINESSES,
-        path=[px.Constant("All"), "CLOSE_YEAR", "NAME"],
-        values="ACV_USD",
-        color="CLOSE_YEAR",
-        color_discrete_sequence=px.colors.qualitative.Pastel,
-        height=1000,
-    )
-    fig.update_layout(
-        coloraxis_showscale=False,
-    )
-    st.plotly_chart(fig, use_container_width=True)
-    st.bar_chart(BUSINESSES, x="CLOSE_YEAR", y="ACV_USD", height=500)
+    fig = load_treemap("CLOSE_YEAR", "ACV_USD", active_only=True, top_n=top_n, filters=FILTERS)
+    st.plotly_chart(json.loads(fig), use_container_width=True)
+    st.bar_chart(roll_up(CUBE, ["CLOSE_YEAR"]), x="CLOSE_YEAR", y="ACV_USD", height=500)
 
     st.write("### Customer Retention by Sign-up Year")
     bar = px.bar(retention_y, x="CLOSE_YEAR", y="CUSTOMER_RETENTION", height=500)
@@ -389,97 +307,63 @@ with tabs[1]:
     # Customer metrics by Region
     st.write("## Region")
     st.write("### All Regions by TCV")
-    fig = px.treemap(
-        BUSINESSES,
-        path=[px.Constant("All"), "COUNTRY", "NAME"],
-        values="NET_TOTAL_USD",
-        color="COUNTRY",
-        color_discrete_sequence=px.colors.qualitative.Pastel,
-        height=1000,
-    )
-    fig.update_layout(
-        coloraxis_showscale=False,
-    )
-    st.plotly_chart(fig, use_container_width=True)
-    st.bar_chart(BUSINESSES, x="COUNTRY", y="NET_TOTAL_USD", height=500)
+    fig = load_treemap("COUNTRY", "NET_TOTAL_USD", active_only=False, top_n=top_n, filters=FILTERS)
+    st.plotly_chart(json.loads(fig), use_container_width=True)
+    st.bar_chart(roll_up(CUBE, ["COUNTRY"]), x="COUNTRY", y="NET_TOTAL_USD", height=500)
 
     st.write("### Retention by Region")
     bar = px.bar(retention_r, x="COUNTRY", y="CUSTOMER_RETENTION", height=500)
     st.plotly_chart(bar, use_container_width=True)
 
-    st.write("### Change in TCV (YoY %, 2021 to 2022)")
+    st.write(f"### Change in TCV (YoY %, {earlier} to {recent})")
 
     bar = px.bar(change_r, x="COUNTRY", y="YoY Change", height=500)
     st.plotly_chart(bar, use_container_width=True)
 
 
-with tabs[2]:
+def deals_section():
     st.write("# Search Deals")
 
+    NEW_LOGOS, RENEWALS, TOP_BUSINESSES = load_deals(filters=FILTERS)
+
     # List the most recent 20 deals
     st.write("## Recent New Logo Deals")
     st.write("The 20 most recently closed new logo deals for Search.")
-    st.write(
-        deal_grid(
-            QUOTELINES[QUOTELINES["CONTRACT_TYPE"] == "New Logo"]
-            .sort_values("CLOSE_DATE", ascending=False)
-            .head(20),
-            color="#d2f8d2",
-        ),
-        unsafe_allow_html=True,
-    )
+    st.write(deal_grid(NEW_LOGOS, color="#d2f8d2"), unsafe_allow_html=True)
 
     # List the most recent 20 renewals
     st.write("## Recent Renewal Deals")
     st.write("The 20 most recent renewals for Search, sorted by contract start date.")
-    st.write(
-        deal_grid(
-            QUOTELINES[QUOTELINES["CONTRACT_TYPE"] == "Renewal"]
-            .sort_values("CLOSE_DATE", ascending=False)
-            .head(20),
-            color="#d2d2f8",
-        ),
-        unsafe_allow_html=True,
-    )
+    st.write(deal_grid(RENEWALS, color="#d2d2f8"), unsafe_allow_html=True)
 
     # List the biggest businesses by total contract value (Sum of net_total_usd) all time
     st.write("## All time biggest businesses")
     st.write("The 10 businesses with the most total contract value, sorted by contract value.")
 
-    top_businesses = (
-        QUOTELINES.groupby(["BUSINESS_ID", "NAME"])
-        .agg(
-            {
-                "NET_TOTAL_USD": "sum",
-                "START_DATE": "min",
-                "END_DATE": "max",
-                "CLOSE_DATE": "min",
-                "TIER": "last",
-            }
-        )
-        .sort_values("NET_TOTAL_USD", ascending=False)
-        .head(10)
-    )
-    # Go from multi index to single index
-    top_businesses = top_businesses.reset_index()
-
     # Render a grid of deal cards
-    st.write(deal_grid(top_businesses, color="#f8e5d2"), unsafe_allow_html=True)
+    st.write(deal_grid(TOP_BUSINESSES, color="#f8e5d2"), unsafe_allow_html=True)
 
-with tabs[3]:
-    # Picker of business ID and name on quotelines table
+
+def specific_business_section():
+    INDEX = load_business_index()
+
+    # Picker of business ID and name; only the top matches for the search are sent to the browser
+    query = st.text_input("Search for a business")
+    candidates = INDEX.search(query, limit=MAX_PICKER_OPTIONS).tolist()
+    if not candidates:
+        st.warning(f"No businesses match '{query}'.")
+        return
     business_id = st.selectbox(
-        "Select a business",
-        BUSINESSES.sort_values("NET_TOTAL_USD", ascending=False).drop_duplicates().values.tolist(),
-        format_func=lambda x: x[1],
+        f"Select a business (top {MAX_PICKER_OPTIONS} matches by TCV)",
+        candidates,
+        format_func=INDEX.names.get,
     )
 
-    # Filter the quotelines table to only include the selected business
-    business_quotelines = QUOTELINES[QUOTELINES["BUSINESS_ID"] == business_id[0]]
-    business_quotelines.sort_values("START_DATE", inplace=True)
+    # The quotelines of the selected business, ordered by START_DATE
+    business_quotelines = load_business_quotelines(business_id)
 
     # Display the business name
-    st.write(f"# {business_id[1]}")
+    st.write(f"# {INDEX.names[business_id]}")
     st.write(
         f"## {business_quotelines['ACCOUNT_TYPE'].iloc[0]} /"
         f" {business_quotelines['INDUSTRY'].iloc[0]}"
@@ -497,9 +381,34 @@ with tabs[3]:
     )
 
     # Display deal grid
-    st.write(deal_grid(business_quotelines, color="#f8e5d2"), unsafe_allow_html=True)
+    st.write(
+        deal_grid(business_quotelines, color="#f8e5d2", key="business_deals_page"),
+        unsafe_allow_html=True,
+    )
 
     # Display the total contract value
     st.write("""---""")
     with st.expander("Contract Details"):
         st.write(business_quotelines)
+
+
+# Only the selected section is computed and rendered on each rerun. Unlike st.tabs, which runs
+# every tab body, picking a business doesn't rebuild the treemaps and retention tables.
+SECTIONS = {
+    "Overall": overall_section,
+    "Customer Summary": customer_summary_section,
+    "Deals": deals_section,
+    "Specific Business": specific_business_section,
+}
+PROFILE = start_page("Search Business")
+try:
+    watch_data()
+    section = st.radio("Section", list(SECTIONS), horizontal=True, label_visibility="collapsed")
+    FILTERS = sidebar_filters()
+    with stage(f"render {section}"):
+        SECTIONS[section]()
+
+    show_data_version()
+finally:
+    # Also when the page fails, so its memory tracing doesn't outlive the run
+    finish_page(PROFILE)
@@ -0,0 +1,52 @@
+import pytest
+
+from dashboard import artifact, stream
+from dashboard.data import CACHE
+from dashboard.feature_kpis import FILTER_SEARCH_BUSINESSES_FILE, load_filter_search_businesses
+
+# Two businesses named Acme, and one renamed from Initech to Initrode
+API_BY_BUSINESSES = """\
+MONTH,BUSINESS_ID,NAME,SEARCHES
+2023-01-01,1,Acme,100
+2023-01-01,2,Acme,50
+2023-01-01,3,Initech,30
+2023-01-01,4,Globex,20
+2023-02-01,1,Acme,80
+2023-02-01,2,Acme,60
+2023-02-01,3,Initrode,90
+2023-02-01,4,Globex,10
+"""
+
+
+@pytest.fixture(params=[False, True], ids=["read", "streamed"])
+def businesses(request, tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    (tmp_path / FILTER_SEARCH_BUSINESSES_FILE).write_text(API_BY_BUSINESSES)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(artifact, "ENABLED", False)
+    if request.param:
+        monkeypatch.setattr(stream, "STREAM_MIN_BYTES", 0)
+    CACHE.clear()
+    try:
+        yield load_filter_search_businesses(top_k=2)
+    finally:
+        CACHE.clear()
+
+
+def test_businesses_are_told_apart_by_id(businesses):
+    top, leaders = businesses
+    assert top.values.tolist() == [
+        ["2023-01", "Acme (1)", 100],
+        ["2023-01", "Acme (2)", 50],
+        ["2023-02", "Initrode", 90],
+        ["2023-02", "Acme (1)", 80],
+        ["2023-01", "All others", 50],
+        ["2023-02", "All others", 70],
+    ]
+    # A renamed business keeps one series, under its latest name
+    assert leaders.drop_duplicates("BUSINESS_ID")[["BUSINESS_ID", "NAME"]].values.tolist() == [
+        [1, "Acme (1)"],
+        [3, "Initrode"],
+        [2, "Acme (2)"],
+    ]
+    assert leaders[leaders["BUSINESS_ID"] == 3]["SEARCHES"].tolist() == [30, 90]
@@ -0,0 +1,113 @@
+import sqlite3
+from contextlib import contextmanager
+
+import pandas as pd
+import pytest
+
+from dashboard import artifact, pushdown, query, search_business
+from dashboard.data import CACHE
+from dashboard.query import SQLiteBackend, build_local_database
+from dashboard.synthetic import generate
+
+ROWS = 5000
+TODAY = "2023-06-30"
+
+# Businesses whose quotelines are compared: the largest by TCV and as many picked at random
+SAMPLES = 5
+
+LOADERS = {
+    "load_businesses": search_business.load_businesses,
+    "load_total_tcv": search_business.load_total_tcv,
+    "load_acv": search_business.load_acv,
+    "load_deals": search_business.load_deals,
+    "load_customer_cube": search_business.load_customer_cube,
+    **{
+        f"load_segment_acv({dimension})": lambda dimension=dimension: (
+            search_business.load_segment_acv(dimension, today=TODAY)
+        )
+        for dimension in [None, *search_business.ACV_SEGMENTS.values()]
+    },
+}
+BUSINESS_SAMPLES = [f"load_business_quotelines(sample {i})" for i in range(2 * SAMPLES)]
+
+
+@contextmanager
+def loading(root, pushed_down):
+    # Loaders read the synthetic exports under `root`, and with pushdown its SQLite database;
+    # every call computes from scratch
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(root)
+        patch.setattr(artifact, "ENABLED", False)
+        patch.setattr(pushdown, "PUSHDOWN", pushed_down)
+        patch.setattr(query, "_BACKEND", SQLiteBackend(str(root / "data" / "search.db")))
+        CACHE.clear()
+        try:
+            yield
+        finally:
+            CACHE.clear()
+
+
+def comparable(value):
+    # Results of the two paths may differ in categories, integer widths and row labels only
+    if isinstance(value, pd.DataFrame):
+        value = value.reset_index(drop=True)
+        return value.astype(
+            {
+                column: object if dtype.kind not in "biufcmM" else dtype
+                for column, dtype in value.dtypes.items()
+            }
+        ).astype({column: "int64" for column in value.select_dtypes("integer").columns})
+    if isinstance(value, tuple):
+        return tuple(comparable(item) for item in value)
+    return value
+
+
+@pytest.fixture(scope="module")
+def results(tmp_path_factory):
+    root = tmp_path_factory.mktemp("pushdown")
+    generate(str(root / "data"), rows=ROWS)
+    build_local_database(str(root / "data"), str(root / "data" / "search.db"))
+
+    with loading(root, pushed_down=False):
+        businesses = search_business.load_businesses()
+    ids = businesses.sort_values("NET_TOTAL_USD", ascending=False)["BUSINESS_ID"]
+    ids = ids.head(SAMPLES).tolist() + ids.sample(SAMPLES, random_state=0).tolist()
+
+    results = {}
+    for pushed_down in [False, True]:
+        with loading(root, pushed_down):
+            results[pushed_down] = {name: comparable(load()) for name, load in LOADERS.items()}
+            for name, business_id in zip(BUSINESS_SAMPLES, ids):
+                value = search_business.load_business_quotelines(business_id)
+                results[pushed_down][name] = comparable(value)
+    return results
+
+
+def assert_matches(expected, actual):
+    if isinstance(expected, tuple):
+        assert len(expected) == len(actual)
+        for expected_item, actual_item in zip(expected, actual):
+            assert_matches(expected_item, actual_item)
+    elif isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(expected, actual, rtol=1e-9)
+    else:
+        assert actual == pytest.approx(expected, rel=1e-9)
+
+
+@pytest.mark.parametrize("name", [*LOADERS, *BUSINESS_SAMPLES])
+def test_pushdown_matches_pandas(results, name):
+    assert_matches(results[False][name], results[True][name])
+
+
+def test_artifact_is_not_served_once_the_tables_change(tmp_path):
+    generate(str(tmp_path / "data"), rows=ROWS)
+    build_local_database(str(tmp_path / "data"), str(tmp_path / "data" / "search.db"))
+    with loading(tmp_path, pushed_down=True):
+        artifact.write_artifact([(search_business.load_total_tcv, (), {})])
+        tcv = search_business.load_total_tcv()
+        artifact.ENABLED = True
+        with sqlite3.connect(tmp_path / "data" / "search.db") as conn:
+            conn.execute("UPDATE search_quotelines SET NET_TOTAL_USD = 2 * NET_TOTAL_USD")
+        CACHE.clear()
+
+        assert search_business.load_total_tcv() == pytest.approx(2 * tcv)
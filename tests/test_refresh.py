@@ -0,0 +1,137 @@
+import pandas as pd
+import pytest
+
+from dashboard import artifact, data, pushdown, search_business
+from dashboard.data import CACHE, FrameCache, resolve_sources
+from dashboard.synthetic import generate
+
+TTL = 600
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(data.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "export.csv"
+    path.write_text("A\n1\n")
+    return str(path)
+
+
+def cache_value(cache, key, sources):
+    return cache.get_or_build(key, sources, lambda: 1, TTL)
+
+
+def stale_keys(cache):
+    return [key for key, sources, build, ttl in cache.sweep()]
+
+
+def test_used_entries_with_unchanged_sources_are_renewed_not_rebuilt(clock, source):
+    cache = FrameCache()
+    cache_value(cache, "frame", [source])
+    clock.now += TTL - 10
+    cache.lookup("frame", (data.file_signature(source),))
+    clock.now += 20
+
+    assert stale_keys(cache) == []
+    assert cache.lookup("frame", (data.file_signature(source),)) == 1
+
+
+def test_entries_with_changed_sources_are_rebuilt(clock, source):
+    cache = FrameCache()
+    cache_value(cache, "frame", [source])
+    with open(source, "a") as export:
+        export.write("2\n")
+
+    assert stale_keys(cache) == ["frame"]
+
+
+def test_entries_without_sources_are_rebuilt_once_their_ttl_expires(clock):
+    cache = FrameCache()
+    cache_value(cache, "query", [])
+    clock.now += TTL / 2
+    cache.lookup("query", ())
+    assert stale_keys(cache) == []
+
+    clock.now += TTL / 2 + 1
+    assert stale_keys(cache) == ["query"]
+
+
+def test_entries_unused_for_their_ttl_are_dropped(clock, source):
+    cache = FrameCache()
+    cache_value(cache, "filtered", [source])
+    cache_value(cache, "query", [])
+    clock.now += TTL + 1
+
+    assert stale_keys(cache) == []
+    assert not cache.has("filtered") and not cache.has("query")
+
+
+def test_positional_keyword_and_default_calls_share_an_entry():
+    calls = []
+
+    @data.cached()
+    def load(filters=()):
+        calls.append(filters)
+        return len(calls)
+
+    try:
+        assert load() == load(()) == load(filters=()) == 1
+        assert load((("TIER", ("Tier 1",)),)) == load(filters=(("TIER", ("Tier 1",)),)) == 2
+    finally:
+        CACHE.clear()
+
+
+def test_pushed_down_loaders_follow_their_ttl_rather_than_the_export(monkeypatch):
+    # The warehouse changes without the export changing, which would renew them forever
+    sources = search_business.load_total_tcv.sources
+    assert resolve_sources(sources) == [search_business.QUOTELINES_FILE]
+    monkeypatch.setattr(pushdown, "PUSHDOWN", True)
+    assert resolve_sources(sources) == []
+
+
+class Revalidator:
+    # Stands in for the refresher: stale entries keep being served, nothing gets rebuilt
+    def submit(self, key, rebuild):
+        pass
+
+
+def test_indexes_pick_rows_from_the_quotelines_they_were_built_from(tmp_path, monkeypatch):
+    generate(str(tmp_path / "data"), rows=2000)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(artifact, "ENABLED", False)
+    monkeypatch.setattr(CACHE, "revalidator", Revalidator())
+    CACHE.clear()
+    filters = (("INDUSTRY", ("Retail",)),)
+    expected = search_business.filtered_quotelines(filters)
+    business_id = int(expected["BUSINESS_ID"].iloc[0])
+    business_quotelines = search_business.load_business_quotelines(business_id)
+
+    # The export grows, and the refresher rebuilds the quotelines before the indexes
+    with open(search_business.QUOTELINES_FILE) as export:
+        rows = export.readlines()
+    with open(search_business.QUOTELINES_FILE, "w") as export:
+        export.writelines(rows[:1] + rows[1:][::-1] + rows[1:100])
+    monkeypatch.setattr(data._REFRESHING, "active", True, raising=False)
+    search_business.load_quotelines()
+    monkeypatch.setattr(data._REFRESHING, "active", False)
+
+    try:
+        pd.testing.assert_frame_equal(search_business.filtered_quotelines(filters), expected)
+        pd.testing.assert_frame_equal(
+            search_business.load_business_quotelines(business_id), business_quotelines
+        )
+    finally:
+        CACHE.clear()
@@ -0,0 +1,41 @@
+import os
+
+import pandas as pd
+import pytest
+
+from dashboard.atomic import replacing
+from dashboard.rollup import refresh_monthly_acv, state_path
+from dashboard.snapshots import convert_csv
+
+
+@pytest.fixture
+def daily_acv(tmp_path):
+    # The daily ACV export, named as under data/ so it is read with its schema
+    days = pd.date_range("2022-11-20", "2023-02-10")
+    file = str(tmp_path / "search_acv_by_date.csv")
+    pd.DataFrame({"CALENDAR_DATE": days, "ACTIVE_ACV": range(len(days))}).to_csv(
+        file, index=False, date_format="%Y-%m-%d"
+    )
+    return file
+
+
+def test_rollup_of_a_snapshot_without_its_csv_matches_the_csv(daily_acv):
+    expected = refresh_monthly_acv(daily_acv)
+    convert_csv(daily_acv)
+    os.remove(daily_acv)
+    os.remove(state_path(daily_acv))
+
+    monthly = refresh_monthly_acv(daily_acv)
+    pd.testing.assert_frame_equal(monthly, expected)
+    assert monthly["ACTIVE_ACV"].tolist() == [10.0, 41.0, 72.0, 82.0]
+
+
+def test_overlapping_writers_never_share_a_temporary_file(tmp_path):
+    path = str(tmp_path / "state.pkl")
+    with replacing(path) as first, replacing(path) as second:
+        assert first != second
+        pd.to_pickle("first", first)
+        pd.to_pickle("second", second)
+    # The writer finishing last wins, and no temporary file is left behind
+    assert pd.read_pickle(path) == "first"
+    assert os.listdir(tmp_path) == ["state.pkl"]
@@ -0,0 +1,115 @@
+import io
+
+import pandas as pd
+import pytest
+
+from dashboard.transforms import build_businesses, prepare_quotelines
+
+TODAY = "2023-03-15"
+
+# A small export covering the cases the derivation has to get right: deals without TCV, two
+# deals closed on a business' first close date, a business without an industry and quotes in a
+# currency without a region (missing or unmapped)
+QUOTELINES = pd.read_csv(
+    io.StringIO(
+        """\
+BUSINESS_ID,NAME,INDUSTRY,CURRENCY,TIER,ACCOUNT_TYPE,NET_TOTAL_USD,CLOSE_DATE,START_DATE,END_DATE
+1,Acme,Retail,USD,Tier 1,Customer,1200.0,2021-01-10,2021-02-01,2022-02-01
+1,Acme,Retail,USD,Tier 2,Customer,300.0,2021-01-10,2021-02-01,2023-02-01
+1,Acme,Retail,USD,Tier 1,Customer,900.0,2022-01-20,2022-02-01,2024-02-01
+1,Acme,Retail,USD,Tier 1,Customer,0.0,2022-06-01,2022-06-01,2023-06-01
+2,Globex,Healthcare,EUR,Tier 3,Partner,5000.0,2020-05-05,2020-06-01,2023-03-15
+2,Globex,Healthcare,EUR,,Partner,250.0,2021-05-05,2021-06-01,2022-06-01
+3,Initech,,GBP,Tier 1,Customer,700.0,2022-09-09,2022-10-01,2023-10-01
+4,Umbrella,Manufacturing,,Tier 2,Customer,800.0,2021-11-11,2021-12-01,2022-12-01
+5,Hooli,Information,AUD,Tier 1,Customer,400.0,2022-02-02,2022-03-01,2023-03-01
+6,Stark,Manufacturing,JPY,Tier 2,Partner,1500.0,2019-08-08,2019-09-01,2022-09-01
+6,Stark,Manufacturing,JPY,Tier 2,Partner,-150.0,2019-08-08,2019-09-01,2020-09-01
+6,Stark,Manufacturing,JPY,Tier 1,Partner,2500.0,2022-08-08,2022-09-01,2025-09-01
+7,Wayne,Retail,CAD,Tier 3,Customer,600.0,2022-03-24,2022-03-15,2023-03-14
+"""
+    )
+)
+
+
+def row_wise_frames(quotelines, today):
+    # The page's derivation before it was vectorized, row-wise apply() calls included
+    quotelines = quotelines[quotelines["NET_TOTAL_USD"] > 0].copy()
+    quotelines["CLOSE_DATE"] = pd.to_datetime(quotelines["CLOSE_DATE"])
+    quotelines["START_DATE"] = pd.to_datetime(quotelines["START_DATE"])
+    quotelines["END_DATE"] = pd.to_datetime(quotelines["END_DATE"])
+    quotelines["FIRST_CLOSE_DATE"] = quotelines.groupby("BUSINESS_ID")["CLOSE_DATE"].transform(
+        "min"
+    )
+    quotelines["COUNTRY"] = quotelines["CURRENCY"].map(
+        {"USD": "NA", "CAD": "NA", "EUR": "EMEA", "GBP": "EMEA", "JPY": "Japan"}
+    )
+    quotelines["CONTRACT_TYPE"] = quotelines.apply(
+        lambda row: "New Logo" if row["CLOSE_DATE"] == row["FIRST_CLOSE_DATE"] else "Renewal",
+        axis=1,
+    )
+
+    businesses = (
+        quotelines.groupby(["BUSINESS_ID", "NAME", "INDUSTRY", "COUNTRY"])
+        .agg(
+            {
+                "NET_TOTAL_USD": "sum",
+                "CLOSE_DATE": "min",
+                "START_DATE": "min",
+                "END_DATE": "max",
+            }
+        )
+        .reset_index()
+    )
+    businesses["ACV_USD"] = businesses["NET_TOTAL_USD"] / (
+        (businesses["END_DATE"] - businesses["START_DATE"]).dt.days / 365
+    )
+    businesses["IS_ACTIVE"] = businesses["END_DATE"].apply(lambda x: x >= pd.to_datetime(today))
+    businesses["CLOSE_YEAR"] = pd.to_datetime(businesses["CLOSE_DATE"]).dt.strftime("%Y")
+    businesses = businesses[
+        (
+            ~businesses["INDUSTRY"].isnull()
+            & ~businesses["CLOSE_DATE"].isnull()
+            & ~businesses["COUNTRY"].isnull()
+        )
+    ]
+    return quotelines, businesses
+
+
+def plain(frame):
+    # The vectorized frames hold categoricals and downcast integers; compare their values only
+    return frame.astype(
+        {
+            column: object if isinstance(dtype, pd.CategoricalDtype) else "int64"
+            for column, dtype in frame.dtypes.items()
+            if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_integer_dtype(dtype)
+        }
+    )
+
+
+@pytest.fixture
+def expected():
+    return row_wise_frames(QUOTELINES, TODAY)
+
+
+def test_prepare_quotelines_matches_row_wise(expected):
+    quotelines = prepare_quotelines(QUOTELINES)
+    pd.testing.assert_frame_equal(plain(quotelines), expected[0])
+
+
+def test_build_businesses_matches_row_wise(expected):
+    businesses = build_businesses(prepare_quotelines(QUOTELINES), today=TODAY)
+    pd.testing.assert_frame_equal(plain(businesses), expected[1])
+
+
+def test_first_close_date_ties_are_all_new_logos():
+    quotelines = prepare_quotelines(QUOTELINES)
+    acme = quotelines[quotelines["BUSINESS_ID"] == 1]
+    assert acme["CONTRACT_TYPE"].tolist() == ["New Logo", "New Logo", "Renewal"]
+
+
+def test_businesses_without_industry_or_region_are_dropped():
+    businesses = build_businesses(prepare_quotelines(QUOTELINES), today=TODAY)
+    assert businesses["BUSINESS_ID"].tolist() == [1, 2, 6, 7]
+    # Contracts ending today still count as active
+    assert businesses["IS_ACTIVE"].tolist() == [True, True, True, False]